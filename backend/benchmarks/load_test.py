@@ -0,0 +1,448 @@
+"""
+End-to-end load test against an in-memory database.
+
+Starts the whole app (startup hooks, middleware, index creation, ingredient
+loading) with benchmarks.memory_mongo in place of MongoDB, seeds a product
+catalog and runs virtual users through a realistic session: register,
+create a hair profile, then a weighted mix of ingredient, barcode and image
+scans, history paging, scan lookups, profile reads and logins (see
+TRAFFIC_MIX). Each user is closed-loop: it sends its next request when the
+previous one finished, plus optional think time.
+
+Throughput and latency percentiles are reported per endpoint, followed by
+the server's own scan stage histograms. Everything runs in one process with
+no network: requests go through httpx's ASGI transport, or with --http over
+loopback to uvicorn serving the app in the same event loop. Image scans
+need tesseract on PATH and are dropped from the mix otherwise.
+
+    python -m benchmarks.load_test --users 50 --duration 30
+    python -m benchmarks.load_test --users 20 --http --db-latency-ms 0.5 --json load.json
+"""
+import argparse
+import asyncio
+import functools
+import io
+import json
+import logging
+import os
+import random
+import secrets
+import shutil
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+# endpoint -> relative weight of a virtual user's next request
+TRAFFIC_MIX = {
+    "POST /scans/ingredients": 30,
+    "POST /scans/barcode": 25,
+    "GET /scans/history": 15,
+    "GET /scans/history/summary": 10,
+    "GET /scans/{scan_id}": 5,
+    "GET /hair-profiles": 5,
+    "GET /users/profile": 5,
+    "POST /scans/image": 3,
+    "POST /auth/login": 2
+}
+# Sent once per user before the mix starts
+SETUP_ENDPOINTS = ("POST /auth/register", "POST /hair-profiles")
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+PASSWORD = "load-test-password"
+HISTORY_PAGE = 20
+# Scan ids a user remembers for GET /scans/{scan_id}
+RECENT_SCANS = 50
+
+PROFILE_CHOICES = {
+    "porosity": ["low", "medium", "high"],
+    "curl_pattern": ["3a", "3b", "3c", "4a", "4b", "4c"],
+    "scalp_type": ["dry", "normal", "oily", "sensitive"],
+    "density": ["low", "medium", "high"]
+}
+# Common label ingredients the engine may not know
+FILLER_INGREDIENTS = [
+    "fragrance", "phenoxyethanol", "citric acid", "tocopherol", "sodium benzoate",
+    "xanthan gum", "potassium sorbate", "aloe barbadensis leaf juice", "panthenol"
+]
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(q * len(values))) - 1))]
+
+def zipf_weights(count: int, exponent: float = 1.0) -> List[float]:
+    """Cumulative weights where item i is (i + 1) ** exponent times rarer than the first"""
+    weights, total = [], 0.0
+    for rank in range(1, count + 1):
+        total += 1 / rank ** exponent
+        weights.append(total)
+    return weights
+
+class Workload:
+    """The seeded inputs virtual users draw from"""
+
+    def __init__(self, seed: int, products: int, texts: int, images: int):
+        self.random = random.Random(seed)
+        names = []
+        for path in sorted(DATA_DIR.glob("*.json")):
+            with open(path) as f:
+                names.extend(ingredient["name"] for ingredient in json.load(f))
+        self.ingredients = names
+
+        # A few products and labels are far more popular than the rest
+        self.texts = [self._ingredient_text() for _ in range(texts)]
+        self.text_weights = zipf_weights(texts)
+        self.barcodes = [f"{400000000000 + i:013d}" for i in range(products)]
+        self.barcode_weights = zipf_weights(products)
+        self.images = [self._label_image(self._ingredient_text()) for _ in range(images)]
+
+    def _ingredient_text(self) -> str:
+        rng = self.random
+        ingredients = rng.sample(self.ingredients, rng.randint(5, min(18, len(self.ingredients))))
+        ingredients += rng.sample(FILLER_INGREDIENTS, rng.randint(0, 3))
+        if rng.random() < 0.7:
+            ingredients.insert(0, "water")
+        return ", ".join(ingredient.title() for ingredient in ingredients)
+
+    def _label_image(self, text: str) -> bytes:
+        from PIL import Image, ImageDraw
+
+        image = Image.new("L", (1200, 400), 255)
+        draw = ImageDraw.Draw(image)
+        words, lines, line = f"Ingredients: {text}".split(" "), [], ""
+        for word in words:
+            if len(line) + len(word) > 60:
+                lines.append(line)
+                line = ""
+            line = f"{line} {word}".strip()
+        lines.append(line)
+        for number, line in enumerate(lines):
+            draw.text((30, 30 + number * 28), line, fill=0)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def products(self) -> List[Dict]:
+        from datetime import datetime
+        from services.product_search import build_search_keys
+
+        now = datetime.utcnow()
+        docs = []
+        for i, barcode in enumerate(self.barcodes):
+            name, brand = f"Load Test Product {i}", f"Brand {i % 40}"
+            docs.append({
+                "product_id": f"load-{i}",
+                "name": name,
+                "brand": brand,
+                "barcode": barcode,
+                "category": self.random.choice(["shampoo", "conditioner", "leave-in", "styling", "oil"]),
+                "ingredients_text": self.texts[i % len(self.texts)],
+                "image_url": None,
+                "search_keys": build_search_keys(name, brand),
+                "created_at": now,
+                "updated_at": now,
+                "scan_count": 0,
+                "created_by": None
+            })
+        return docs
+
+class Recorder:
+    """Latency samples by endpoint"""
+
+    def __init__(self):
+        # endpoint -> (started, seconds, status); status 0 is a transport error
+        self.samples: Dict[str, List] = defaultdict(list)
+
+    def record(self, endpoint: str, started: float, seconds: float, status: int):
+        self.samples[endpoint].append((started, seconds, status))
+
+    def summary(self, window_start: float, window_end: float) -> Dict[str, Dict]:
+        """
+        Per-endpoint results. Mix endpoints only count requests started in
+        the measurement window; setup endpoints count every request.
+        """
+        results = {}
+        for endpoint, samples in self.samples.items():
+            setup = endpoint in SETUP_ENDPOINTS
+            if not setup:
+                samples = [sample for sample in samples if window_start <= sample[0] < window_end]
+            if not samples:
+                continue
+            latencies = sorted(seconds * 1000 for _, seconds, _ in samples)
+            statuses = Counter(status for _, _, status in samples)
+            errors = sum(count for code, count in statuses.items() if not 200 <= code < 400)
+            results[endpoint] = {
+                "requests": len(samples),
+                "errors": errors,
+                "statuses": {str(code): count for code, count in sorted(statuses.items())},
+                "req_per_s": None if setup else round(len(samples) / (window_end - window_start), 1),
+                "p50_ms": round(percentile(latencies, 0.50), 2),
+                "p95_ms": round(percentile(latencies, 0.95), 2),
+                "p99_ms": round(percentile(latencies, 0.99), 2),
+                "max_ms": round(latencies[-1], 2)
+            }
+        return results
+
+class VirtualUser:
+    """One simulated app user: a session and its own scans"""
+
+    def __init__(self, number: int, run_id: str, http: httpx.AsyncClient, workload: Workload,
+                 recorder: Recorder, mix: Dict[str, int], think: float, seed: int):
+        self.email = f"load-{run_id}-{number}@loadtest.dev"
+        self.http = http
+        self.workload = workload
+        self.recorder = recorder
+        self.endpoints = list(mix)
+        self.weights = list(mix.values())
+        self.think = think
+        self.random = random.Random(seed * 100003 + number)
+        self.headers: Dict[str, str] = {}
+        self.scan_ids: List[str] = []
+        self.scans = 0
+
+    async def call(self, endpoint: str, method: str, path: str, retry_busy: bool = False, **kwargs) -> Optional[httpx.Response]:
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await self.http.request(method, f"/api{path}", headers=self.headers, **kwargs)
+            except httpx.HTTPError:
+                self.recorder.record(endpoint, started, time.perf_counter() - started, 0)
+                return None
+            self.recorder.record(endpoint, started, time.perf_counter() - started, response.status_code)
+            if not (retry_busy and response.status_code == 503):
+                return response
+            # The password hasher sheds load; clients back off and retry
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+    async def setup(self) -> bool:
+        response = await self.call(
+            "POST /auth/register", "POST", "/auth/register", retry_busy=True,
+            json={"email": self.email, "password": PASSWORD, "full_name": "Load Test"}
+        )
+        if response is None or response.status_code != 201:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        profile = {field: self.random.choice(choices) for field, choices in PROFILE_CHOICES.items()}
+        response = await self.call("POST /hair-profiles", "POST", "/hair-profiles", json=profile)
+        return response is not None and response.status_code == 201
+
+    async def run(self, deadline: float):
+        if not await self.setup():
+            return
+        while time.perf_counter() < deadline:
+            endpoint = self.random.choices(self.endpoints, self.weights)[0]
+            await getattr(self, ACTIONS[endpoint])(endpoint)
+            if self.think:
+                await asyncio.sleep(self.random.expovariate(1 / self.think))
+
+    def _created(self, response: Optional[httpx.Response]):
+        if response is not None and response.status_code == 201:
+            self.scans += 1
+            self.scan_ids = [response.json()["scan_id"], *self.scan_ids[:RECENT_SCANS - 1]]
+
+    async def scan_ingredients(self, endpoint: str):
+        text = self.random.choices(self.workload.texts, cum_weights=self.workload.text_weights)[0]
+        self._created(await self.call(endpoint, "POST", "/scans/ingredients", json={"ingredients_text": text}))
+
+    async def scan_barcode(self, endpoint: str):
+        barcode = self.random.choices(self.workload.barcodes, cum_weights=self.workload.barcode_weights)[0]
+        self._created(await self.call(endpoint, "POST", "/scans/barcode", json={"barcode": barcode}))
+
+    async def scan_image(self, endpoint: str):
+        image = self.random.choice(self.workload.images)
+        self._created(await self.call(
+            endpoint, "POST", "/scans/image", files={"file": ("label.png", image, "image/png")}
+        ))
+
+    async def history(self, endpoint: str):
+        # Most visits look at the first page; some scroll back
+        pages = max(1, -(-self.scans // HISTORY_PAGE))
+        page = 0 if self.random.random() < 0.7 else self.random.randrange(pages)
+        path = "/scans/history/summary" if endpoint.endswith("/summary") else "/scans/history"
+        await self.call(endpoint, "GET", path, params={"limit": HISTORY_PAGE, "skip": page * HISTORY_PAGE})
+
+    async def get_scan(self, endpoint: str):
+        if not self.scan_ids:
+            return await self.scan_ingredients("POST /scans/ingredients")
+        await self.call(endpoint, "GET", f"/scans/{self.random.choice(self.scan_ids)}")
+
+    async def get_hair_profile(self, endpoint: str):
+        await self.call(endpoint, "GET", "/hair-profiles")
+
+    async def get_user_profile(self, endpoint: str):
+        await self.call(endpoint, "GET", "/users/profile")
+
+    async def login(self, endpoint: str):
+        response = await self.call(
+            endpoint, "POST", "/auth/login", json={"email": self.email, "password": PASSWORD}
+        )
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+# TRAFFIC_MIX endpoint -> VirtualUser method
+ACTIONS = {
+    "POST /scans/ingredients": "scan_ingredients",
+    "POST /scans/barcode": "scan_barcode",
+    "GET /scans/history": "history",
+    "GET /scans/history/summary": "history",
+    "GET /scans/{scan_id}": "get_scan",
+    "GET /hair-profiles": "get_hair_profile",
+    "GET /users/profile": "get_user_profile",
+    "POST /scans/image": "scan_image",
+    "POST /auth/login": "login"
+}
+
+def print_report(results: Dict[str, Dict], elapsed: float, stages: Dict[str, Dict]):
+    print(f"\n{'endpoint':<28} {'requests':>8} {'errors':>6} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    order = [*SETUP_ENDPOINTS, *TRAFFIC_MIX]
+    for endpoint in sorted(results, key=order.index):
+        row = results[endpoint]
+        rate = "setup" if row["req_per_s"] is None else f"{row['req_per_s']:.1f}"
+        print(f"{endpoint:<28} {row['requests']:>8} {row['errors']:>6} {rate:>8} "
+              f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['max_ms']:>8.2f}")
+
+    mix = [row for endpoint, row in results.items() if endpoint not in SETUP_ENDPOINTS]
+    total = sum(row["requests"] for row in mix)
+    print(f"{'total':<28} {total:>8} {sum(row['errors'] for row in mix):>6} {total / elapsed:>8.1f}")
+
+    failures = {
+        endpoint: {code: count for code, count in row["statuses"].items() if not 200 <= int(code) < 400}
+        for endpoint, row in results.items()
+    }
+    failures = {endpoint: codes for endpoint, codes in failures.items() if codes}
+    if failures:
+        print("\nnon-2xx/3xx responses (status 0 = transport error):")
+        for endpoint, codes in failures.items():
+            print(f"  {endpoint}: {codes}")
+
+    print("\nserver-side scan stages (histogram bucket bounds):")
+    for stage, stats in stages.items():
+        if stats["count"]:
+            print(f"  {stage:<8} n={stats['count']:<7} avg={stats['avg_ms']:7.2f} ms  "
+                  f"p50<={stats['p50_le_ms']} ms  p95<={stats['p95_le_ms']} ms  p99<={stats['p99_le_ms']} ms")
+
+async def serve_http(app) -> tuple:
+    """Run uvicorn on a free loopback port in this event loop"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", access_log=False))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, task, f"http://127.0.0.1:{port}"
+
+async def run(args) -> Dict:
+    # Imported here: settings are read from the environment main() prepared
+    import config.db
+    from benchmarks.memory_mongo import MemoryClient
+
+    config.db.AsyncIOMotorClient = functools.partial(MemoryClient, latency=args.db_latency_ms / 1000)
+
+    from config.db import get_database
+    from middleware.rate_limit import rate_limiter
+    from modules.scans.pipeline import scan_pipeline
+    from server import app
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    if not args.rate_limits:
+        rate_limiter.requests_per_minute = 10 ** 9
+        rate_limiter.bucket_limits = {bucket: 10 ** 9 for bucket in rate_limiter.bucket_limits}
+
+    mix = dict(TRAFFIC_MIX)
+    if not shutil.which("tesseract"):
+        print("tesseract not found: image scans left out of the mix")
+        mix.pop("POST /scans/image")
+
+    workload = Workload(args.seed, args.products, args.texts, args.images if "POST /scans/image" in mix else 0)
+    server = server_task = None
+    if args.http:
+        server, server_task, base_url = await serve_http(app)
+        transport = None
+    else:
+        await app.router.startup()
+        base_url, transport = "http://load-test", httpx.ASGITransport(app=app)
+
+    try:
+        await get_database().products.insert_many(workload.products())
+        print(f"{len(workload.barcodes)} products seeded; {args.users} users over {args.ramp:.0f}s ramp, "
+              f"{args.warmup:.0f}s warmup, {args.duration:.0f}s measured "
+              f"({'uvicorn over loopback' if args.http else 'ASGI in-process'}, "
+              f"db latency {args.db_latency_ms} ms)")
+
+        recorder = Recorder()
+        run_id = secrets.token_hex(4)
+        limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as http:
+            start = time.perf_counter()
+            window_start = start + args.warmup
+            window_end = window_start + args.duration
+
+            async def user(number: int):
+                # Spread arrivals over the ramp so registration doesn't all land at once
+                await asyncio.sleep(args.ramp * number / args.users)
+                await VirtualUser(
+                    number, run_id, http, workload, recorder, mix, args.think_ms / 1000, args.seed
+                ).run(window_end)
+
+            await asyncio.gather(*(user(number) for number in range(args.users)))
+
+        results = recorder.summary(window_start, window_end)
+        print_report(results, args.duration, scan_pipeline.stats())
+        return {
+            "config": vars(args),
+            "mix": mix,
+            "endpoints": results,
+            "scan_stages": scan_pipeline.stats()
+        }
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await server_task
+        else:
+            await app.router.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds excluded from the mix results")
+    parser.add_argument("--ramp", type=float, default=None, help="seconds to start all users over (default: warmup)")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a user's requests")
+    parser.add_argument("--products", type=int, default=2000, help="seeded products (barcode scans)")
+    parser.add_argument("--texts", type=int, default=500, help="distinct ingredient lists")
+    parser.add_argument("--images", type=int, default=8, help="distinct label images")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="added to every database operation")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="override BCRYPT_ROUNDS")
+    parser.add_argument("--http", action="store_true", help="serve with uvicorn on loopback instead of ASGI in-process")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the configured rate limits")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's INFO logging")
+    args = parser.parse_args()
+    if args.ramp is None:
+        args.ramp = args.warmup
+
+    # The database is never contacted; the settings still require these
+    os.environ.setdefault("MONGO_URL", "memory://load-test")
+    os.environ.setdefault("JWT_SECRET_KEY", secrets.token_hex(32))
+    if args.bcrypt_rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    report = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {args.json}")
+
+if __name__ == "__main__":
+    main()
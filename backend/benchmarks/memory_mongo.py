@@ -0,0 +1,742 @@
+"""
+In-memory stand-in for the parts of Motor the API uses.
+
+MemoryClient is constructed like AsyncIOMotorClient, so replacing
+config.db.AsyncIOMotorClient with it runs the real connect_to_mongo() and
+create_indexes() against process memory. It supports the filters, updates,
+cursors and write results the routes and services rely on:
+
+- filters: equality (including array membership), dotted paths, $and,
+  $or, $eq, $ne, $in, $nin, $gt, $gte, $lt, $lte, $exists, $all
+- updates: $set, $unset, $inc, $setOnInsert, upserts
+- top-level inclusion/exclusion projections, sort/skip/limit cursors
+- unique and sparse indexes (DuplicateKeyError / BulkWriteError with
+  code 11000 like the server); TTL indexes are accepted but never expire
+- aggregate with $match, $group ($sum), $sort and $limit
+
+Indexed fields keep a value -> documents map, so equality and $in lookups
+on them (users by email, scans by user_id, products by barcode) don't scan
+the collection. Documents are copied on the way in and out, roughly
+standing in for BSON encoding, and every operation yields to the event
+loop, optionally after `latency` seconds to model the network round trip.
+Anything else raises NotImplementedError rather than silently
+disagreeing with MongoDB.
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.operations import DeleteOne, InsertOne, UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+_MISSING = object()
+
+def _copy(value: Any) -> Any:
+    """Copy the containers of a document; scalars are immutable"""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+def _get(doc: Dict, path: str) -> Any:
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        else:
+            return _MISSING
+    return value
+
+def _set(doc: Dict, path: str, value: Any):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+def _unset(doc: Dict, path: str):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+def _equals(value: Any, expected: Any) -> bool:
+    if value is _MISSING:
+        return expected is None
+    if value == expected:
+        return True
+    return isinstance(value, list) and not isinstance(expected, list) and expected in value
+
+def _compare(value: Any, operator: str, operand: Any) -> bool:
+    values = value if isinstance(value, list) else [value]
+    for item in values:
+        if item is _MISSING or item is None:
+            continue
+        try:
+            if operator == "$gt" and item > operand:
+                return True
+            if operator == "$gte" and item >= operand:
+                return True
+            if operator == "$lt" and item < operand:
+                return True
+            if operator == "$lte" and item <= operand:
+                return True
+        except TypeError:
+            # MongoDB only compares values of the same type
+            continue
+    return False
+
+def _match_condition(value: Any, condition: Any) -> bool:
+    if not (isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition)):
+        return _equals(value, condition)
+
+    for operator, operand in condition.items():
+        if operator == "$eq":
+            matched = _equals(value, operand)
+        elif operator == "$ne":
+            matched = not _equals(value, operand)
+        elif operator == "$in":
+            matched = any(_equals(value, item) for item in operand)
+        elif operator == "$nin":
+            matched = not any(_equals(value, item) for item in operand)
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            matched = _compare(value, operator, operand)
+        elif operator == "$exists":
+            matched = (value is not _MISSING) == bool(operand)
+        elif operator == "$all":
+            matched = all(_equals(value, item) for item in operand)
+        else:
+            raise NotImplementedError(f"Query operator {operator} is not supported in memory")
+        if not matched:
+            return False
+    return True
+
+def matches(doc: Dict, query: Dict) -> bool:
+    """Whether a document satisfies a MongoDB filter"""
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(doc, part) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, part) for part in condition):
+                return False
+        elif key.startswith("$"):
+            raise NotImplementedError(f"Query operator {key} is not supported in memory")
+        elif not _match_condition(_get(doc, key), condition):
+            return False
+    return True
+
+def _project(doc: Dict, projection: Optional[Dict]) -> Dict:
+    if not projection:
+        return _copy(doc)
+
+    include_id = projection.get("_id", 1)
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if any(fields.values()):
+        result = {key: _copy(doc[key]) for key in fields if key in doc}
+        if include_id and "_id" in doc:
+            result = {"_id": doc["_id"], **result}
+        return result
+
+    result = {key: _copy(value) for key, value in doc.items() if key not in fields}
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+def _apply_update(doc: Dict, update: Dict, inserting: bool):
+    for operator, fields in update.items():
+        if operator == "$set":
+            for path, value in fields.items():
+                _set(doc, path, _copy(value))
+        elif operator == "$setOnInsert":
+            if inserting:
+                for path, value in fields.items():
+                    _set(doc, path, _copy(value))
+        elif operator == "$inc":
+            for path, amount in fields.items():
+                current = _get(doc, path)
+                _set(doc, path, amount if current is _MISSING else current + amount)
+        elif operator == "$unset":
+            for path in fields:
+                _unset(doc, path)
+        else:
+            raise NotImplementedError(f"Update operator {operator} is not supported in memory")
+
+def _upsert_base(query: Dict) -> Dict:
+    """The equality fields of a filter, which an upsert copies into the new document"""
+    doc: Dict = {}
+    for key, condition in query.items():
+        if key.startswith("$"):
+            continue
+        if isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            if "$eq" in condition:
+                _set(doc, key, _copy(condition["$eq"]))
+            continue
+        _set(doc, key, _copy(condition))
+    return doc
+
+def _sort_key(value: Any) -> Tuple:
+    # Missing and null sort first, then by type, like MongoDB's comparison order
+    if value is _MISSING or value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (4, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (5, value)
+    return (3, str(value))
+
+def _sort(docs: List[Dict], keys: List[Tuple[str, int]]) -> List[Dict]:
+    # Stable sorts from the last key to the first give a compound ordering
+    for field, direction in reversed(keys):
+        docs.sort(key=lambda doc: _sort_key(_get(doc, field)), reverse=direction < 0)
+    return docs
+
+def _normalize_keys(keys: Any, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if isinstance(keys, str):
+        return [(keys, 1 if direction is None else direction)]
+    return [(field, order) for field, order in keys]
+
+def _hashable(value: Any) -> bool:
+    return not isinstance(value, (dict, list))
+
+class _Index:
+    """A created index: value lookups on its first field, and its unique constraint"""
+
+    def __init__(self, name: str, keys: List[Tuple[str, int]], unique: bool, sparse: bool):
+        self.name = name
+        self.fields = [field for field, _ in keys]
+        self.unique = unique
+        self.sparse = sparse
+        # value of the first field -> document slots
+        self.values: Dict[Any, Set[int]] = {}
+        # full key -> document slot, for unique indexes
+        self.owners: Dict[Tuple, int] = {}
+
+    def _first_values(self, doc: Dict) -> Iterator[Any]:
+        value = _get(doc, self.fields[0])
+        if value is _MISSING:
+            value = None
+        for item in (value if isinstance(value, list) else [value]):
+            if _hashable(item):
+                yield item
+
+    def _unique_key(self, doc: Dict) -> Optional[Tuple]:
+        values = [_get(doc, field) for field in self.fields]
+        if self.sparse and all(value is _MISSING for value in values):
+            return None
+        key = tuple(None if value is _MISSING else value for value in values)
+        return key if all(_hashable(value) for value in key) else None
+
+    def conflict(self, doc: Dict, slot: int) -> Optional[Tuple]:
+        """The duplicate key if `doc` at `slot` would violate this index"""
+        if not self.unique:
+            return None
+        key = self._unique_key(doc)
+        if key is None:
+            return None
+        owner = self.owners.get(key)
+        return key if owner is not None and owner != slot else None
+
+    def add(self, doc: Dict, slot: int):
+        for value in self._first_values(doc):
+            self.values.setdefault(value, set()).add(slot)
+        if self.unique:
+            key = self._unique_key(doc)
+            if key is not None:
+                self.owners[key] = slot
+
+    def remove(self, doc: Dict, slot: int):
+        for value in self._first_values(doc):
+            slots = self.values.get(value)
+            if slots is not None:
+                slots.discard(slot)
+                if not slots:
+                    del self.values[value]
+        if self.unique:
+            key = self._unique_key(doc)
+            if key is not None and self.owners.get(key) == slot:
+                del self.owners[key]
+
+class _Cursor:
+    """Async iteration and to_list() over a result list"""
+
+    def __init__(self):
+        self._results: Optional[List[Dict]] = None
+        self._position = 0
+
+    def _evaluate(self) -> List[Dict]:
+        raise NotImplementedError
+
+    async def _load(self):
+        if self._results is None:
+            await self._yield()
+            self._results = self._evaluate()
+
+    def batch_size(self, size: int) -> "_Cursor":
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        await self._load()
+        end = len(self._results) if length is None else self._position + length
+        results = self._results[self._position:end]
+        self._position += len(results)
+        return results
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict:
+        await self._load()
+        if self._position >= len(self._results):
+            raise StopAsyncIteration
+        self._position += 1
+        return self._results[self._position - 1]
+
+    async def _yield(self):
+        await asyncio.sleep(0)
+
+class MemoryCursor(_Cursor):
+    """The result of MemoryCollection.find(); evaluated on first read"""
+
+    def __init__(self, collection: "MemoryCollection", query: Dict, projection: Optional[Dict]):
+        super().__init__()
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, keys: Any, direction: Optional[int] = None) -> "MemoryCursor":
+        self._sort = _normalize_keys(keys, direction)
+        return self
+
+    def skip(self, count: int) -> "MemoryCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "MemoryCursor":
+        self._limit = count
+        return self
+
+    def _evaluate(self) -> List[Dict]:
+        docs = self._collection._matching(self._query)
+        if self._sort:
+            docs = _sort(docs, self._sort)
+        docs = docs[self._skip:self._skip + self._limit if self._limit else None]
+        return [_project(doc, self._projection) for doc in docs]
+
+    async def _yield(self):
+        await self._collection._round_trip()
+
+class _AggregateCursor(_Cursor):
+    def __init__(self, collection: "MemoryCollection", pipeline: List[Dict]):
+        super().__init__()
+        self._collection = collection
+        self._pipeline = pipeline
+
+    def _evaluate(self) -> List[Dict]:
+        docs = list(self._collection._docs.values())
+        for stage in self._pipeline:
+            (operator, spec), = stage.items()
+            if operator == "$match":
+                docs = [doc for doc in docs if matches(doc, spec)]
+            elif operator == "$group":
+                docs = self._group(docs, spec)
+            elif operator == "$sort":
+                docs = _sort(list(docs), list(spec.items()))
+            elif operator == "$limit":
+                docs = docs[:spec]
+            else:
+                raise NotImplementedError(f"Aggregation stage {operator} is not supported in memory")
+        return [_copy(doc) for doc in docs]
+
+    @staticmethod
+    def _expression(doc: Dict, expression: Any) -> Any:
+        if isinstance(expression, str) and expression.startswith("$"):
+            value = _get(doc, expression[1:])
+            return None if value is _MISSING else value
+        if isinstance(expression, dict):
+            return {key: _AggregateCursor._expression(doc, value) for key, value in expression.items()}
+        return expression
+
+    @staticmethod
+    def _group(docs: List[Dict], spec: Dict) -> List[Dict]:
+        groups: Dict[Any, Dict] = {}
+        for doc in docs:
+            group_id = _AggregateCursor._expression(doc, spec["_id"])
+            key = repr(group_id)
+            group = groups.setdefault(key, {"_id": group_id})
+            for field, accumulator in spec.items():
+                if field == "_id":
+                    continue
+                (operator, expression), = accumulator.items()
+                if operator != "$sum":
+                    raise NotImplementedError(f"Accumulator {operator} is not supported in memory")
+                value = _AggregateCursor._expression(doc, expression)
+                group[field] = group.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+        return list(groups.values())
+
+    async def _yield(self):
+        await self._collection._round_trip()
+
+class MemoryCollection:
+    """One collection: documents in insertion order plus their indexes"""
+
+    def __init__(self, name: str, latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self._docs: Dict[int, Dict] = {}
+        self._next_slot = 0
+        self._indexes: Dict[str, _Index] = {}
+        self.create_index_sync([("_id", 1)], unique=True, name="_id_")
+
+    async def _round_trip(self):
+        await asyncio.sleep(self.latency)
+
+    # Indexes
+
+    def create_index_sync(self, keys: Any, unique: bool = False, sparse: bool = False, name: Optional[str] = None, **kwargs) -> str:
+        keys = _normalize_keys(keys)
+        name = name or "_".join(f"{field}_{order}" for field, order in keys)
+        if name in self._indexes:
+            return name
+        index = _Index(name, keys, unique, sparse)
+        for slot, doc in self._docs.items():
+            if index.conflict(doc, slot) is not None:
+                raise DuplicateKeyError(f"E11000 duplicate key error building index {name}", 11000)
+            index.add(doc, slot)
+        self._indexes[name] = index
+        return name
+
+    async def create_index(self, keys: Any, **kwargs) -> str:
+        await self._round_trip()
+        return self.create_index_sync(keys, **kwargs)
+
+    def _check_unique(self, doc: Dict, slot: int):
+        for index in self._indexes.values():
+            key = index.conflict(doc, slot)
+            if key is not None:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.name} index: {index.name} dup key: {key}",
+                    11000,
+                    {"code": 11000, "keyPattern": {field: 1 for field in index.fields}}
+                )
+
+    def _store(self, slot: int, doc: Dict):
+        self._docs[slot] = doc
+        for index in self._indexes.values():
+            index.add(doc, slot)
+
+    def _unstore(self, slot: int) -> Dict:
+        doc = self._docs.pop(slot)
+        for index in self._indexes.values():
+            index.remove(doc, slot)
+        return doc
+
+    # Reads
+
+    def _candidate_slots(self, query: Dict) -> Optional[Iterable[int]]:
+        """Slots an indexed equality or $in condition narrows the query to, if any"""
+        best: Optional[Set[int]] = None
+        for index in self._indexes.values():
+            condition = query.get(index.fields[0], _MISSING)
+            if condition is _MISSING:
+                continue
+            if isinstance(condition, dict) and set(condition) == {"$in"}:
+                values = condition["$in"]
+            elif isinstance(condition, dict) and any(key.startswith("$") for key in condition):
+                continue
+            else:
+                values = [condition]
+            if not all(_hashable(value) for value in values):
+                continue
+            slots: Set[int] = set()
+            for value in values:
+                slots |= index.values.get(value, set())
+            if best is None or len(slots) < len(best):
+                best = slots
+        return None if best is None else sorted(best)
+
+    def _matching_slots(self, query: Dict) -> List[int]:
+        candidates = self._candidate_slots(query)
+        if candidates is None:
+            candidates = list(self._docs)
+        return [slot for slot in candidates if matches(self._docs[slot], query)]
+
+    def _matching(self, query: Dict) -> List[Dict]:
+        return [self._docs[slot] for slot in self._matching_slots(query)]
+
+    def _first_slot(self, query: Dict, sort: Any = None) -> Optional[int]:
+        slots = self._matching_slots(query)
+        if not slots:
+            return None
+        for field, direction in reversed(_normalize_keys(sort) if sort else []):
+            slots.sort(key=lambda slot: _sort_key(_get(self._docs[slot], field)), reverse=direction < 0)
+        return slots[0]
+
+    def find(self, filter: Optional[Dict] = None, projection: Optional[Dict] = None, **kwargs) -> MemoryCursor:
+        return MemoryCursor(self, filter or {}, projection)
+
+    async def find_one(self, filter: Optional[Dict] = None, projection: Optional[Dict] = None, sort: Any = None) -> Optional[Dict]:
+        await self._round_trip()
+        slot = self._first_slot(filter or {}, sort)
+        return None if slot is None else _project(self._docs[slot], projection)
+
+    async def count_documents(self, filter: Dict) -> int:
+        await self._round_trip()
+        return len(self._matching_slots(filter))
+
+    async def estimated_document_count(self) -> int:
+        await self._round_trip()
+        return len(self._docs)
+
+    def aggregate(self, pipeline: List[Dict], **kwargs) -> _AggregateCursor:
+        return _AggregateCursor(self, pipeline)
+
+    # Writes
+
+    def _insert(self, document: Dict) -> Any:
+        if "_id" not in document:
+            # Like pymongo, the caller's document gets its _id
+            document["_id"] = ObjectId()
+        doc = _copy(document)
+        slot = self._next_slot
+        self._check_unique(doc, slot)
+        self._next_slot += 1
+        self._store(slot, doc)
+        return doc["_id"]
+
+    def _update(self, query: Dict, update: Dict, upsert: bool, many: bool) -> Tuple[int, int, Any]:
+        """Returns (matched, modified, upserted_id)"""
+        slots = self._matching_slots(query)
+        if not many:
+            slots = slots[:1]
+
+        if not slots:
+            if not upsert:
+                return 0, 0, None
+            doc = _upsert_base(query)
+            _apply_update(doc, update, inserting=True)
+            return 0, 0, self._insert(doc)
+
+        modified = 0
+        for slot in slots:
+            old = self._docs[slot]
+            new = _copy(old)
+            _apply_update(new, update, inserting=False)
+            if new == old:
+                continue
+            self._unstore(slot)
+            try:
+                self._check_unique(new, slot)
+            except DuplicateKeyError:
+                self._store(slot, old)
+                raise
+            self._store(slot, new)
+            modified += 1
+        return len(slots), modified, None
+
+    async def insert_one(self, document: Dict, **kwargs) -> InsertOneResult:
+        await self._round_trip()
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: List[Dict], ordered: bool = True, **kwargs) -> InsertManyResult:
+        await self._round_trip()
+        inserted, errors = [], []
+        for position, document in enumerate(documents):
+            try:
+                inserted.append(self._insert(document))
+            except DuplicateKeyError as e:
+                errors.append({"index": position, "code": 11000, "errmsg": str(e), "op": document})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError(self._bulk_details(inserted=len(inserted), errors=errors))
+        return InsertManyResult(inserted, True)
+
+    async def update_one(self, filter: Dict, update: Dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        await self._round_trip()
+        matched, modified, upserted_id = self._update(filter, update, upsert, many=False)
+        return self._update_result(matched, modified, upserted_id)
+
+    async def update_many(self, filter: Dict, update: Dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        await self._round_trip()
+        matched, modified, upserted_id = self._update(filter, update, upsert, many=True)
+        return self._update_result(matched, modified, upserted_id)
+
+    @staticmethod
+    def _update_result(matched: int, modified: int, upserted_id: Any) -> UpdateResult:
+        raw = {"n": 1 if upserted_id is not None else matched, "nModified": modified, "ok": 1.0}
+        if upserted_id is not None:
+            raw["upserted"] = upserted_id
+        return UpdateResult(raw, True)
+
+    async def delete_one(self, filter: Dict, **kwargs) -> DeleteResult:
+        await self._round_trip()
+        slot = self._first_slot(filter)
+        if slot is None:
+            return DeleteResult({"n": 0, "ok": 1.0}, True)
+        self._unstore(slot)
+        return DeleteResult({"n": 1, "ok": 1.0}, True)
+
+    async def delete_many(self, filter: Dict, **kwargs) -> DeleteResult:
+        await self._round_trip()
+        slots = self._matching_slots(filter)
+        for slot in slots:
+            self._unstore(slot)
+        return DeleteResult({"n": len(slots), "ok": 1.0}, True)
+
+    async def find_one_and_update(
+        self,
+        filter: Dict,
+        update: Dict,
+        projection: Optional[Dict] = None,
+        sort: Any = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+        **kwargs
+    ) -> Optional[Dict]:
+        await self._round_trip()
+        slot = self._first_slot(filter, sort)
+        if slot is None:
+            if not upsert:
+                return None
+            _, _, upserted_id = self._update(filter, update, upsert=True, many=False)
+            if return_document != ReturnDocument.AFTER:
+                return None
+            return _project(self._docs[self._first_slot({"_id": upserted_id})], projection)
+
+        before = _project(self._docs[slot], projection)
+        self._update({"_id": self._docs[slot]["_id"]}, update, upsert=False, many=False)
+        if return_document == ReturnDocument.AFTER:
+            return _project(self._docs[slot], projection)
+        return before
+
+    async def find_one_and_delete(self, filter: Dict, projection: Optional[Dict] = None, sort: Any = None, **kwargs) -> Optional[Dict]:
+        await self._round_trip()
+        slot = self._first_slot(filter, sort)
+        if slot is None:
+            return None
+        return _project(self._unstore(slot), projection)
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        await self._round_trip()
+        counts = {"inserted": 0, "matched": 0, "modified": 0, "removed": 0}
+        upserted, errors = [], []
+        for position, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    counts["inserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany)):
+                    matched, modified, upserted_id = self._update(
+                        request._filter, request._doc, bool(request._upsert), many=isinstance(request, UpdateMany)
+                    )
+                    counts["matched"] += matched
+                    counts["modified"] += modified
+                    if upserted_id is not None:
+                        upserted.append({"index": position, "_id": upserted_id})
+                elif isinstance(request, DeleteOne):
+                    slot = self._first_slot(request._filter)
+                    if slot is not None:
+                        self._unstore(slot)
+                        counts["removed"] += 1
+                else:
+                    raise NotImplementedError(f"{type(request).__name__} is not supported in memory")
+            except DuplicateKeyError as e:
+                errors.append({"index": position, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+
+        details = self._bulk_details(counts["inserted"], counts["matched"], counts["modified"], counts["removed"], upserted, errors)
+        if errors:
+            raise BulkWriteError(details)
+        return BulkWriteResult(details, True)
+
+    @staticmethod
+    def _bulk_details(inserted: int = 0, matched: int = 0, modified: int = 0, removed: int = 0,
+                      upserted: Optional[List] = None, errors: Optional[List] = None) -> Dict:
+        upserted = upserted or []
+        return {
+            "nInserted": inserted,
+            "nUpserted": len(upserted),
+            "nMatched": matched,
+            "nModified": modified,
+            "nRemoved": removed,
+            "upserted": upserted,
+            "writeErrors": errors or [],
+            "writeConcernErrors": []
+        }
+
+    async def drop(self):
+        await self._round_trip()
+        for slot in list(self._docs):
+            self._unstore(slot)
+
+class MemoryDatabase:
+    """Collections are created on first access, like MongoDB's"""
+
+    def __init__(self, name: str, latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def get_collection(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(name, self.latency)
+        return collection
+
+    __getitem__ = get_collection
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def command(self, command: Any, **kwargs) -> Dict:
+        if command in ("ping", {"ping": 1}):
+            return {"ok": 1.0}
+        raise NotImplementedError(f"Command {command} is not supported in memory")
+
+class MemoryClient:
+    """
+    Drop-in for AsyncIOMotorClient(url, **kwargs); the URL and driver
+    options (event_listeners, ...) are ignored.
+
+    Args:
+        latency: Seconds every operation waits before running, to model
+            the network round trip to a MongoDB server
+    """
+
+    def __init__(self, url: Optional[str] = None, latency: float = 0.0, **kwargs):
+        self.latency = latency
+        self._databases: Dict[str, MemoryDatabase] = {}
+        self.admin = self["admin"]
+
+    def get_database(self, name: str) -> MemoryDatabase:
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases[name] = MemoryDatabase(name, self.latency)
+        return database
+
+    __getitem__ = get_database
+
+    async def drop_database(self, name: str):
+        self._databases.pop(name, None)
+
+    def close(self):
+        pass
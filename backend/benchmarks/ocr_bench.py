@@ -0,0 +1,53 @@
+"""
+Run label photos through the OCR pool and report throughput and latency.
+
+    python -m benchmarks.ocr_bench path/to/labels/*.jpg --repeat 5 --concurrency 4
+
+Requires the tesseract binary.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from services.ocr_service import OCRService, OCRBusy, OCRTimeout
+
+async def main(args):
+    images = []
+    for path in args.paths:
+        with open(path, "rb") as f:
+            images.append(f.read())
+
+    service = OCRService(workers=args.workers, max_queue=args.concurrency)
+    if not service.available:
+        raise SystemExit("tesseract binary not found")
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(image_data):
+        async with semaphore:
+            try:
+                await service.extract_ingredients_from_image(image_data)
+            except (OCRBusy, OCRTimeout):
+                pass
+
+    # Warm up the worker processes
+    await one(images[0])
+    service.latency = type(service.latency)(name="ocr")
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(image) for _ in range(args.repeat) for image in images])
+    elapsed = time.perf_counter() - started
+
+    stats = service.stats()
+    stats["images_per_second"] = round(args.repeat * len(images) / elapsed, 2)
+    print(json.dumps(stats, indent=2))
+    service.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,105 @@
+"""
+Benchmark product search: legacy unanchored regex vs indexed search_keys.
+
+Seeds a scratch database with synthetic products and reports query latency
+percentiles for both strategies. Requires a running MongoDB (MONGO_URL).
+
+    python -m benchmarks.product_search_bench --products 1000000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from config.db import db_instance
+from config.env import settings
+from motor.motor_asyncio import AsyncIOMotorClient
+from services.product_search import product_search_service, build_search_keys
+
+BRANDS = ["Shea Moisture", "Cantu", "Mielle", "Camille Rose", "Aunt Jackie's", "Kinky-Curly",
+          "As I Am", "Eden Bodyworks", "Carol's Daughter", "TGIN", "Design Essentials", "Pattern"]
+ADJECTIVES = ["Curl", "Coconut", "Argan", "Rosemary", "Mint", "Honey", "Avocado", "Hibiscus",
+              "Jamaican Black Castor", "Manuka", "Biotin", "Deep", "Leave-In", "Twist"]
+NOUNS = ["Cream", "Custard", "Butter", "Conditioner", "Shampoo", "Oil", "Gel", "Mask",
+         "Smoothie", "Milk", "Pudding", "Mousse", "Serum", "Treatment"]
+CATEGORIES = ["conditioner", "shampoo", "leave-in", "oil", "styling", "treatment"]
+QUERIES = ["curl cream", "shea", "coconut oil", "mielle rosemary", "cantu", "deep cond",
+           "argan serum", "leave-in", "honey mask", "twist butter"]
+
+def _make_product(i: int) -> dict:
+    name = f"{random.choice(ADJECTIVES)} {random.choice(ADJECTIVES)} {random.choice(NOUNS)} {i}"
+    brand = random.choice(BRANDS)
+    now = datetime.utcnow()
+    return {
+        "product_id": str(uuid.uuid4()),
+        "name": name,
+        "brand": brand,
+        "barcode": f"{i:013d}",
+        "category": random.choice(CATEGORIES),
+        "ingredients_text": "Water, Glycerin, Shea Butter",
+        "image_url": None,
+        "search_keys": build_search_keys(name, brand),
+        "created_at": now,
+        "updated_at": now,
+        "scan_count": random.randint(0, 500)
+    }
+
+async def seed(db, count: int, batch_size: int = 10000):
+    existing = await db.products.estimated_document_count()
+    if existing >= count:
+        print(f"Reusing {existing} seeded products")
+        return
+
+    await db.products.drop()
+    started = time.perf_counter()
+    for start in range(0, count, batch_size):
+        docs = [_make_product(i) for i in range(start, min(start + batch_size, count))]
+        await db.products.insert_many(docs, ordered=False)
+    print(f"Seeded {count} products in {time.perf_counter() - started:.1f}s")
+
+    await db.products.create_index("name")
+    await db.products.create_index([("search_keys", 1), ("scan_count", -1)])
+    await db.products.create_index([("category", 1), ("search_keys", 1), ("scan_count", -1)])
+
+async def legacy_search(db, q: str, limit: int = 20):
+    cursor = db.products.find({
+        "$or": [
+            {"name": {"$regex": q, "$options": "i"}},
+            {"brand": {"$regex": q, "$options": "i"}}
+        ]
+    }).limit(limit)
+    return await cursor.to_list(length=limit)
+
+async def time_queries(label: str, search, rounds: int):
+    timings = []
+    for _ in range(rounds):
+        for q in QUERIES:
+            started = time.perf_counter()
+            await search(q)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:>8}: p50={statistics.median(timings):8.2f}ms  p95={p95:8.2f}ms  n={len(timings)}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--db", default=f"{settings.MONGO_DB_NAME}_bench")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.MONGO_URL)
+    db = client[args.db]
+    db_instance.client, db_instance.db = client, db
+
+    await seed(db, args.products)
+    await time_queries("regex", lambda q: legacy_search(db, q), args.rounds)
+    await time_queries("indexed", lambda q: product_search_service.search(q), args.rounds)
+
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Benchmark the rate limiter with many distinct clients.
+
+Compares the sliding-window counter against the previous list-of-timestamps
+design (reproduced below for reference) and reports per-request cost and
+memory held by limiter state.
+
+    python -m benchmarks.rate_limit_bench --clients 10000 --requests 200000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from middleware.rate_limit import RateLimiter
+
+class LegacyRateLimiter:
+    """The list-of-timestamps limiter this module replaced"""
+
+    def __init__(self, requests_per_minute: int = 60):
+        self.requests_per_minute = requests_per_minute
+        self.requests = defaultdict(list)
+
+    def hit(self, key: str) -> bool:
+        now = datetime.utcnow()
+        self.requests[key] = [t for t in self.requests[key] if now - t < timedelta(minutes=1)]
+        if len(self.requests[key]) >= self.requests_per_minute:
+            return False
+        self.requests[key].append(now)
+        return True
+
+def run(label: str, limiter, keys, requests: int):
+    tracemalloc.start()
+    started = time.perf_counter()
+    allowed = 0
+    for i in range(requests):
+        allowed += limiter.hit(keys[i % len(keys)] if i % 2 else random.choice(keys))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>16}: {elapsed / requests * 1e6:7.2f} us/request  "
+          f"{requests / elapsed:10.0f} req/s  allowed={allowed}  peak_state={peak / 1024 / 1024:.1f} MiB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=60)
+    args = parser.parse_args()
+
+    keys = [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(args.clients)]
+    random.seed(1)
+    run("legacy", LegacyRateLimiter(args.limit), keys, args.requests)
+    random.seed(1)
+    run("sliding-window", RateLimiter(args.limit), keys, args.requests)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Benchmark GET /api/scans/history?limit=100 throughput.
+
+Compares the legacy handler (ScanResult(**doc) per document, then FastAPI's
+response_model validation and jsonable_encoder) with the current orjson
+path. First the response building step alone is timed for 100 documents,
+then both endpoints are driven in-process through httpx against the same
+seeded scans. The HTTP part requires a running MongoDB (MONGO_URL); the
+scratch database is dropped afterwards.
+
+    python -m benchmarks.scan_response_bench --requests 2000 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+from fastapi import Depends, Query
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from config.db import db_instance
+from config.env import settings
+from middleware.auth import create_access_token, get_current_user
+from middleware.rate_limit import rate_limiter
+from modules.scans.models import ScanResult
+from modules.scans.serialization import scan_list_response
+from server import app
+
+HISTORY_PATH = "/api/scans/history?limit=100"
+LEGACY_PATH = "/bench/legacy-history?limit=100"
+
+def _make_scan(user_id: str, i: int) -> dict:
+    return {
+        "scan_id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "scan_type": "ingredients",
+        "product_name": f"Curl Cream {i}",
+        "product_brand": "Bench",
+        "product_category": "styling",
+        "product_id": None,
+        "ingredients_text": "Water, Glycerin, Shea Butter, Coconut Oil, Cetearyl Alcohol, Fragrance",
+        "verdict": "GOOD",
+        "overall_score": 72,
+        "moisture_score": 80,
+        "buildup_risk": 35,
+        "scalp_score": 70,
+        "water_based": True,
+        "heavy_oils": False,
+        "protein_heavy": False,
+        "explanation": ["✅ Water is the first ingredient", "⚠️ Contains coconut oil", "✅ Glycerin attracts moisture"],
+        "matched_ingredients_count": 5,
+        "total_ingredients_count": 6,
+        "hair_profile": {"porosity": "low", "curl_pattern": "4a", "scalp_type": "dry", "density": "medium"},
+        "created_at": datetime.utcnow() - timedelta(minutes=i)
+    }
+
+async def legacy_history(
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(20, ge=1, le=100),
+    skip: int = Query(0, ge=0)
+):
+    """The history handler as it was before the orjson response path"""
+    cursor = db_instance.db.scans.find(
+        {"user_id": current_user["user_id"]}
+    ).sort("created_at", -1).skip(skip).limit(limit)
+    scans = await cursor.to_list(length=limit)
+    return [ScanResult(**scan) for scan in scans]
+
+async def time_response_building(rounds: int):
+    """Per-response cost of turning 100 scan documents into a JSON body"""
+    docs = [_make_scan("bench-user", i) for i in range(100)]
+    field = create_response_field(name="history", type_=List[ScanResult])
+
+    async def legacy():
+        content = await serialize_response(field=field, response_content=[ScanResult(**doc) for doc in docs])
+        return JSONResponse(content).body
+
+    async def current():
+        return scan_list_response(docs).body
+
+    assert json.loads(await legacy()) == json.loads(await current()), "legacy and current bodies differ"
+    for label, build in (("legacy", legacy), ("orjson", current)):
+        for _ in range(rounds // 10):
+            await build()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await build()
+        print(f"{label:>8}: {(time.perf_counter() - started) / rounds * 1000:7.3f} ms to build a 100-scan response")
+
+async def drive(client: httpx.AsyncClient, path: str, headers: dict, requests: int, concurrency: int) -> List[float]:
+    timings = []
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.text
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return timings
+
+def report(label: str, timings: List[float], elapsed: float):
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:>8}: {len(timings) / elapsed:8.1f} req/s  "
+          f"p50={statistics.median(timings):7.2f}ms  p95={p95:7.2f}ms  n={len(timings)}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--db", default=f"{settings.MONGO_DB_NAME}_bench")
+    parser.add_argument("--build-only", action="store_true", help="skip the HTTP run (no MongoDB needed)")
+    args = parser.parse_args()
+
+    await time_response_building(args.requests)
+    if args.build_only:
+        return
+
+    client = AsyncIOMotorClient(settings.MONGO_URL)
+    db = client[args.db]
+    db_instance.client, db_instance.db = client, db
+
+    user_id = str(uuid.uuid4())
+    await db.users.insert_one({"user_id": user_id, "email": "bench@example.com", "is_active": True})
+    await db.scans.insert_many([_make_scan(user_id, i) for i in range(100)])
+    await db.scans.create_index([("user_id", 1), ("created_at", -1)])
+
+    app.add_api_route("/bench/legacy-history", legacy_history, response_model=List[ScanResult])
+    rate_limiter.requests_per_minute = 10 ** 9
+    rate_limiter.bucket_limits = {bucket: 10 ** 9 for bucket in rate_limiter.bucket_limits}
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user_id})}"}
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            legacy = (await http.get(LEGACY_PATH, headers=headers)).json()
+            current = (await http.get(HISTORY_PATH, headers=headers)).json()
+            assert legacy == current, "legacy and current responses differ"
+
+            for label, path in (("legacy", LEGACY_PATH), ("orjson", HISTORY_PATH)):
+                await drive(http, path, headers, args.concurrency * 10, args.concurrency)
+                started = time.perf_counter()
+                timings = await drive(http, path, headers, args.requests, args.concurrency)
+                report(label, timings, time.perf_counter() - started)
+    finally:
+        await client.drop_database(args.db)
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
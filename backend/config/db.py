@@ -1,6 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ConnectionFailure
 from config.env import settings
+from services.metrics import mongo_command_listener
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,7 +16,9 @@ async def connect_to_mongo():
     """Connect to MongoDB"""
     try:
         logger.info(f"Connecting to MongoDB at {settings.MONGO_URL}")
-        db_instance.client = AsyncIOMotorClient(settings.MONGO_URL)
+        # Command monitoring feeds per-collection latencies into /metrics
+        listeners = [mongo_command_listener] if settings.METRICS_ENABLED else []
+        db_instance.client = AsyncIOMotorClient(settings.MONGO_URL, event_listeners=listeners)
         db_instance.db = db_instance.client[settings.MONGO_DB_NAME]
         
         # Test connection
@@ -46,8 +49,11 @@ async def create_indexes():
         await db_instance.db.hair_profiles.create_index("user_id", unique=True)
         
         # Products collection
+        await db_instance.db.products.create_index("product_id", unique=True)
         await db_instance.db.products.create_index("barcode", unique=True, sparse=True)
         await db_instance.db.products.create_index("name")
+        await db_instance.db.products.create_index([("search_keys", 1), ("scan_count", -1)])
+        await db_instance.db.products.create_index([("category", 1), ("search_keys", 1), ("scan_count", -1)])
         
         # Ingredients collection
         await db_instance.db.ingredients.create_index("name", unique=True)
@@ -56,6 +62,19 @@ async def create_indexes():
         # Scans collection
         await db_instance.db.scans.create_index("user_id")
         await db_instance.db.scans.create_index("created_at")
+        await db_instance.db.scans.create_index([("user_id", 1), ("created_at", -1)])
+        await db_instance.db.scans.create_index([("user_id", 1), ("scan_id", 1)])
+        
+        # Background scan jobs (removed once expires_at passes)
+        await db_instance.db.scan_jobs.create_index("job_id", unique=True)
+        await db_instance.db.scan_jobs.create_index("expires_at", expireAfterSeconds=0)
+        
+        # OCR result cache (perceptual hash bands, expires after OCR_CACHE_TTL_DAYS)
+        await db_instance.db.ocr_cache.create_index([("hash", 1), ("options_key", 1)], unique=True)
+        await db_instance.db.ocr_cache.create_index([("bands", 1), ("options_key", 1)])
+        await db_instance.db.ocr_cache.create_index(
+            "created_at", expireAfterSeconds=settings.OCR_CACHE_TTL_DAYS * 86400
+        )
         
         logger.info("Database indexes created successfully")
     except Exception as e:
@@ -11,11 +11,36 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days
+    JWT_CACHE_SIZE: int = 10000  # verified tokens kept in memory per worker
+    
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12  # changing this rehashes passwords on next login
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32
     
     # API
     API_V1_PREFIX: str = "/api"
     PROJECT_NAME: str = "Afro Hair Product Scanner"
     
+    # Rate limiting
+    RATE_LIMIT_PER_MINUTE: int = 60
+    # Per-bucket budgets in cost units (see middleware.rate_limit.rate_limit)
+    RATE_LIMIT_AUTH_PER_MINUTE: int = 10
+    RATE_LIMIT_SCAN_PER_MINUTE: int = 60
+    RATE_LIMIT_BULK_PER_MINUTE: int = 60
+    RATE_LIMIT_BACKEND: str = "memory"  # memory (per worker) or redis
+    RATE_LIMIT_REDIS_URL: str = "unix:///tmp/hair-scanner-ratelimit.sock"
+    RATE_LIMIT_FLUSH_INTERVAL: float = 0.05
+    
+    # Metrics (Prometheus text format at /metrics)
+    METRICS_ENABLED: bool = True
+    
+    # Request profiling (off unless a sample rate or admin token is set)
+    PROFILE_SAMPLE_RATE: float = 0.0  # fraction of requests profiled, e.g. 0.001
+    PROFILE_TOKEN: str = ""  # requests with a matching X-Profile header are profiled
+    PROFILE_DIR: str = "/tmp/hair-scanner-profiles"
+    PROFILE_INTERVAL_MS: float = 5.0
+    
     # CORS
     BACKEND_CORS_ORIGINS: str = '["http://localhost:3000"]'
     
@@ -23,6 +48,39 @@ class Settings(BaseSettings):
     OCR_API_KEY: str = "placeholder"
     BARCODE_API_KEY: str = "placeholder"
     
+    # Local OCR (tesseract in a process pool)
+    OCR_WORKERS: int = 2
+    OCR_MAX_QUEUE: int = 8
+    OCR_TIMEOUT_SECONDS: float = 15.0
+    OCR_LANG: str = "eng"
+    OCR_TESSERACT_CONFIG: str = "--oem 1 --psm 6"
+    OCR_TARGET_DPI: int = 300
+    OCR_MAX_SIDE: int = 2000  # 4000 px phone photos decode at half scale
+    OCR_MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    OCR_MAX_PIXELS: int = 50_000_000
+    OCR_CACHE_SIZE: int = 5000  # perceptual-hash results kept in memory
+    OCR_CACHE_MAX_DISTANCE: int = 10  # bits (of 256) still treated as the same photo
+    OCR_CACHE_PERSIST: bool = False  # also keep results in the ocr_cache collection
+    OCR_CACHE_TTL_DAYS: int = 30
+    
+    # Background image scan jobs
+    SCAN_JOB_WORKERS: int = 2
+    SCAN_JOB_MAX_QUEUE: int = 20  # each queued job holds its image in memory
+    SCAN_JOB_MAX_PER_USER: int = 3
+    SCAN_JOB_TTL_SECONDS: int = 600
+    SCAN_JOB_EVENTS_TIMEOUT: float = 120.0
+    # Validate scan responses against their models once before sending
+    # (debugging aid; stored scans are trusted and go straight to orjson)
+    VALIDATE_SCAN_RESPONSES: bool = False
+    
+    # External barcode lookup (Open Food Facts compatible)
+    EXTERNAL_BARCODE_ENABLED: bool = False
+    EXTERNAL_BARCODE_URL: str = "https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
+    EXTERNAL_BARCODE_TIMEOUT: float = 3.0
+    EXTERNAL_BARCODE_MAX_CONNECTIONS: int = 20
+    EXTERNAL_BARCODE_FAILURE_THRESHOLD: int = 5
+    EXTERNAL_BARCODE_RESET_TIMEOUT: float = 30.0
+    
     @property
     def cors_origins(self) -> List[str]:
         try:
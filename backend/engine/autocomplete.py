@@ -0,0 +1,78 @@
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+
+class IngredientIndex:
+    """
+    In-memory autocomplete index over ingredient names and aliases.
+
+    Every name/alias is stored together with each of its word-start suffixes
+    ("shea butter" is also stored as "butter") in one sorted array, so a
+    prefix lookup is a binary search followed by a short forward scan.
+    """
+
+    def __init__(self, ingredients: Dict[str, Dict]):
+        self.ingredients = ingredients
+        self.by_term: Dict[str, str] = {}
+        self.by_category: Dict[str, List[Dict]] = {}
+        self._all = list(ingredients.values())
+
+        entries: List[Tuple[str, int, str]] = []
+
+        for key, ingredient in ingredients.items():
+            self.by_category.setdefault(ingredient.get("category", "").lower(), []).append(ingredient)
+
+            terms = [key] + [alias.lower() for alias in ingredient.get("aliases", [])]
+            for term in terms:
+                self.by_term.setdefault(term, key)
+                words = term.split()
+                for offset in range(len(words)):
+                    # offset 0 is the full term; later offsets are mid-name words
+                    entries.append((" ".join(words[offset:]), offset, key))
+
+        entries.sort()
+        self._entries = entries
+        self._terms = [entry[0] for entry in entries]
+
+    def get(self, name: str) -> Optional[Dict]:
+        """Exact lookup by name or alias"""
+        key = self.by_term.get(name.lower().strip())
+        return self.ingredients.get(key) if key else None
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Prefix search ranked by: exact match, then full-name prefix,
+        then mid-name word prefix; shorter names first within each tier.
+        """
+        query = " ".join(query.lower().split())
+        if not query:
+            return []
+
+        best: Dict[str, Tuple[int, int, str]] = {}
+        position = bisect_left(self._terms, query)
+
+        while position < len(self._entries):
+            term, offset, key = self._entries[position]
+            if not term.startswith(query):
+                break
+
+            if term == query and offset == 0:
+                tier = 0
+            elif offset == 0:
+                tier = 1
+            else:
+                tier = 2
+
+            rank = (tier, len(key), key)
+            if key not in best or rank < best[key]:
+                best[key] = rank
+            position += 1
+
+        ranked = sorted(best.values())[:limit]
+        return [self.ingredients[key] for _, _, key in ranked]
+
+    def list(self, category: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """List ingredients, optionally filtered by category"""
+        if category:
+            return self.by_category.get(category.lower(), [])[:limit]
+        return self._all[:limit]
@@ -1,8 +1,12 @@
+import hashlib
 import json
 import os
-from typing import Dict, List, Optional
+import time
+from typing import Callable, Dict, List, Optional
 from pathlib import Path
 
+from engine.autocomplete import IngredientIndex
+from engine.segmentation import extract_ingredient_block, repair_ocr_text, split_ingredients
 from engine.rules.low_porosity import evaluate_low_porosity
 from engine.rules.high_porosity import evaluate_high_porosity
 from engine.rules.scalp import evaluate_scalp_safety
@@ -17,6 +21,10 @@ class IngredientEngine:
     
     def __init__(self):
         self.ingredient_database = self._load_ingredient_database()
+        self.ingredient_index = IngredientIndex(self.ingredient_database)
+        self.ingredient_version = self._compute_ingredient_version()
+        # Called with (stage, seconds) for parse, match and rules when set
+        self.timing_observer: Optional[Callable[[str, float], None]] = None
     
     def _load_ingredient_database(self) -> Dict[str, Dict]:
         """Load all ingredient data from JSON files"""
@@ -37,27 +45,23 @@ class IngredientEngine:
         
         return database
     
+    def _compute_ingredient_version(self) -> str:
+        """Content hash of the ingredient database, used for HTTP caching"""
+        payload = json.dumps(self.ingredient_database, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+    
     def parse_ingredient_list(self, ingredient_text: str) -> List[str]:
         """
         Parse ingredient text into a clean list.
-        Handles various formats: comma-separated, with parentheses, etc.
+        Label text (e.g. from OCR) is cut down to the "Ingredients:" block
+        first, so marketing copy and directions never reach the matcher.
         """
-        # Remove common prefixes
-        text = ingredient_text.lower().strip()
-        text = text.replace("ingredients:", "").replace("aqua", "water")
+        block = repair_ocr_text(extract_ingredient_block(ingredient_text))
         
-        # Split by common delimiters
         ingredients = []
-        for item in text.split(","):
-            # Clean up each ingredient
-            item = item.strip()
-            
-            # Remove content in parentheses (often derivatives or specifications)
-            if "(" in item:
-                item = item[:item.index("(")].strip()
-            
-            if item:
-                ingredients.append(item)
+        for item in split_ingredients(block.lower()):
+            item = item.replace("aqua", "water")
+            ingredients.append(item)
         
         return ingredients
     
@@ -120,19 +124,31 @@ class IngredientEngine:
         Returns:
             Complete scoring result with verdict and explanations
         """
+        observe = self.timing_observer
+        started = time.perf_counter()
+        
         # Parse and match ingredients
         ingredient_names = self.parse_ingredient_list(ingredient_text)
+        parsed = time.perf_counter()
         matched_ingredients, ingredient_positions = self.match_ingredients(ingredient_names)
+        matched = time.perf_counter()
+        
+        if observe is not None:
+            observe("parse", parsed - started)
+            observe("match", matched - parsed)
         
         if not matched_ingredients:
             return {
                 "verdict": "UNKNOWN",
+                "overall_score": 0,
                 "moisture_score": 0,
                 "buildup_risk": 0,
                 "scalp_score": 0,
                 "water_based": False,
                 "heavy_oils": False,
                 "protein_heavy": False,
+                "matched_ingredients_count": 0,
+                "total_ingredients_count": len(ingredient_names),
                 "explanation": ["❌ Unable to analyze - no recognized ingredients found"]
             }
         
@@ -196,6 +212,9 @@ class IngredientEngine:
         # Add verdict summary
         explanation.insert(0, f"{verdict_emoji} Overall verdict: {verdict} (Score: {int(overall_score)}/100)")
         
+        if observe is not None:
+            observe("rules", time.perf_counter() - matched)
+        
         return {
             "verdict": verdict,
             "overall_score": int(overall_score),
@@ -209,6 +228,23 @@ class IngredientEngine:
             "total_ingredients_count": len(ingredient_names),
             "explanation": explanation
         }
+    
+    def score_products(self, ingredient_texts: List[str], hair_profile: Dict) -> List[Dict]:
+        """
+        Score several ingredient lists against one hair profile.
+        Identical ingredient lists are only scored once.
+        """
+        scored = {}
+        results = []
+        
+        for ingredient_text in ingredient_texts:
+            if ingredient_text not in scored:
+                scored[ingredient_text] = self.score_product(ingredient_text, hair_profile)
+            result = dict(scored[ingredient_text])
+            result["explanation"] = list(result["explanation"])
+            results.append(result)
+        
+        return results
 
 
 # Global engine instance
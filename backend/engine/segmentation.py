@@ -0,0 +1,114 @@
+import re
+from typing import List
+
+# "Ingredients:" including common OCR confusions (1/l for i, 3 for e) and
+# the bilingual "Ingredients/Ingrédients" seen on imported products
+INGREDIENTS_HEADER = re.compile(
+    r"(?<![A-Za-z])(?:[i1l|]ngr[e3ée]d[i1l|][e3]nt[s5]?|inci|composition)\b"
+    r"(?:\s*/\s*[i1l|]ngr[e3ée]d[i1l|][e3]nt[s5]?)?\s*[:;.\-]?",
+    re.IGNORECASE
+)
+
+# Sections that usually follow the ingredient list on a label
+SECTION_END = re.compile(
+    r"\b(?:directions|how to use|to use|usage|warnings?|cautions?|precautions?|"
+    r"keep out of|for external use|avoid contact|made in|manufactured|distributed|"
+    r"net\s*w[t7]|net\s*vol|best before|exp(?:iry)?\b|lot\b|www\.|https?://)"
+    # Footnotes ("*Certified organic") start on their own line or right
+    # after the list's closing period ("Glycerin*. *Certified organic")
+    r"|\n\s*[*†‡]|[.;]\s+[*†‡]",
+    re.IGNORECASE
+)
+
+BULLETS = re.compile(r"[•·●∙▪◦‣]")
+FOOTNOTE_MARKS = re.compile(r"[*†‡]+")
+BRACKETS = re.compile(r"\[[^\[\]]*\]")
+# "Butyrospermum Parkii (Shea) Butter": Latin name, common name, rest
+PARENTHETICAL = re.compile(r"^(?P<before>[^()]*)\((?P<inside>[^()]*)\)(?P<after>[^()]*)$")
+OUTSIDE_PARENTHESES_SEPARATOR = re.compile(r"[,;](?![^()]*\))")
+PERCENTAGE = re.compile(r"\d+(?:[.,]\d+)?\s*%")
+# Period separators, but not decimals ("0.5%") or abbreviations ("Vit. E")
+PERIOD_SEPARATOR = re.compile(r"(?P<word>\w*)\.(?=\s|$)")
+ABBREVIATIONS = {"vit", "ext", "extr", "no", "hydr", "ci"}
+
+# Fragments with more words than this are sentences, not ingredient names
+MAX_INGREDIENT_WORDS = 8
+
+def repair_ocr_text(text: str) -> str:
+    """
+    Undo typical OCR and label-layout damage.
+
+    - "Cetearyl Alco-\\nhol" -> "Cetearyl Alcohol" (line-break hyphenation)
+    - "Ceteareth-\\n20" -> "Ceteareth-20" (real hyphens before numbers are kept)
+    - "|" misread for "l", "0" inside words misread for "o"
+    - Bullets become separators, footnote marks (organic*) are dropped
+    - Remaining line breaks and runs of whitespace become single spaces
+    """
+    text = re.sub(r"(?<=[A-Za-z])-\s*\n\s*(?=[a-z])", "", text)
+    text = re.sub(r"-\s*\n\s*", "-", text)
+    text = text.replace("|", "l")
+    text = re.sub(r"(?<=[A-Za-z])0(?=[A-Za-z])", "o", text)
+    text = BULLETS.sub(",", text)
+    text = FOOTNOTE_MARKS.sub("", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def extract_ingredient_block(text: str) -> str:
+    """
+    Return only the ingredient list from label text.
+
+    Text after an "Ingredients:" header is kept up to the next label
+    section (directions, warnings, footnotes, ...). Text without a header
+    is assumed to be an ingredient list already (manual entry) and
+    returned as is.
+    """
+    header = INGREDIENTS_HEADER.search(text)
+    if header is None:
+        return text
+
+    block = text[header.end():]
+    end = SECTION_END.search(block)
+    if end is not None:
+        block = block[:end.start()]
+    return block
+
+def _common_name(item: str) -> str:
+    """
+    Prefer the common name INCI labels put in parentheses.
+    "Cocos Nucifera (Coconut) Oil" -> "Coconut Oil",
+    "Aqua (Water)" -> "Aqua", "Fragrance (Parfum)" -> "Fragrance"
+    """
+    match = PARENTHETICAL.match(item)
+    if match is None:
+        # Unclosed parenthesis left by OCR
+        return item[:item.index("(")] if "(" in item else item
+    if match.group("after").strip():
+        return f"{match.group('inside')} {match.group('after')}"
+    return match.group("before")
+
+def split_ingredients(block: str) -> List[str]:
+    """Split an ingredient block on commas, semicolons and separator periods"""
+    block = BRACKETS.sub(" ", block)
+    block = PERCENTAGE.sub(" ", block)
+    block = PERIOD_SEPARATOR.sub(
+        lambda m: m.group(0) if m.group("word").lower() in ABBREVIATIONS else f"{m.group('word')},",
+        block
+    )
+
+    if block.count("(") == block.count(")"):
+        # Commas inside parentheses ("Fragrance (Parfum, Limonene)") are not separators
+        items = OUTSIDE_PARENTHESES_SEPARATOR.split(block)
+    else:
+        # OCR dropped a parenthesis; split everywhere
+        items = re.split(r"[,;]", block)
+
+    ingredients = []
+    for item in items:
+        item = " ".join(_common_name(item).split()).strip(" .:-()")
+        if item and len(item.split()) <= MAX_INGREDIENT_WORDS:
+            ingredients.append(item)
+    return ingredients
+
+def segment_ingredient_text(text: str) -> str:
+    """Repaired ingredient block, e.g. for storing what OCR actually read"""
+    block = repair_ocr_text(extract_ingredient_block(text))
+    return re.sub(r"\s+,", ",", block).strip(" .,:;")
@@ -5,11 +5,17 @@ from datetime import datetime, timedelta
 from typing import Optional
 from config.env import settings
 from config.db import get_database
+from services.cache import LRUCache
+import hashlib
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
+# sha256(token) -> verified claims, each entry expiring at the token's exp
+verified_tokens = LRUCache(maxsize=settings.JWT_CACHE_SIZE, name="verified_tokens")
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -23,6 +29,29 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
+def decode_access_token(token: str) -> dict:
+    """
+    Verify a JWT and return its claims (raises JWTError if invalid).
+
+    Clients resend the same long-lived token on every request, so verified
+    claims are cached by token digest until the token expires. Only tokens
+    that passed signature verification are cached; the digest means a
+    forged token can never match a cached entry.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = verified_tokens.get(digest)
+    if claims is not None:
+        return claims
+
+    claims = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = exp - time.time()
+        if ttl > 0:
+            verified_tokens.set(digest, claims, ttl=ttl)
+    return claims
+
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Verify JWT token and return user data"""
     credentials_exception = HTTPException(
@@ -33,7 +62,7 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
     
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload = decode_access_token(token)
         user_id: str = payload.get("sub")
         
         if user_id is None:
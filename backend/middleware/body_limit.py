@@ -0,0 +1,111 @@
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.cache import LRUCache
+from typing import Optional
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+def max_body_size(limit: int):
+    """
+    Cap the request body size of a route (in bytes).
+    Place it below the router decorator, like rate_limit.
+    """
+    def decorator(endpoint):
+        endpoint.max_body_size = limit
+        return endpoint
+    return decorator
+
+class BodyTooLarge(Exception):
+    pass
+
+class BodySizeLimitMiddleware:
+    """
+    Enforce per-route body size caps while the body is streamed.
+
+    Requests declaring a larger Content-Length are rejected before anything
+    is read; chunked uploads are cut off as soon as they pass the cap, so
+    an oversized upload never reaches the multipart parser's spool.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # (method, path) -> limit (0 when the route has none)
+        self._limits = LRUCache(maxsize=4096, name="body_limit_routes")
+
+    def _limit_for(self, scope: Scope) -> Optional[int]:
+        cache_key = (scope["method"], scope["path"])
+        limit = self._limits.get(cache_key)
+        if limit is None:
+            limit = 0
+            for route in scope["app"].router.routes:
+                match, _ = route.matches(scope)
+                if match == Match.FULL:
+                    limit = getattr(route.endpoint, "max_body_size", 0)
+                    break
+            self._limits.set(cache_key, limit)
+        return limit or None
+
+    @staticmethod
+    async def _reject(send: Send, limit: int):
+        body = json.dumps({"detail": f"Request body too large (max {limit // (1024 * 1024)} MB)"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self._limit_for(scope)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    await self._reject(send, limit)
+                    return
+                break
+
+        received = 0
+        too_large = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    too_large = True
+                    raise BodyTooLarge()
+            return message
+
+        async def guarded_send(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                if response_started:
+                    return
+                response_started = True
+                if too_large:
+                    # The body parser turns the aborted read into a 400; answer 413 instead
+                    await self._reject(send, limit)
+                    return
+            elif too_large:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except BodyTooLarge:
+            if not response_started:
+                await self._reject(send, limit)
+        if too_large:
+            logger.warning(f"Rejected oversized body on {scope['path']} after {received} bytes")
@@ -0,0 +1,56 @@
+from fastapi import Request, Response, status
+from typing import Optional
+import hashlib
+
+# Catalog data changes rarely; ingredients only change on deploy
+INGREDIENT_CACHE_CONTROL = "public, max-age=3600"
+PRODUCT_CACHE_CONTROL = "public, max-age=300, must-revalidate"
+
+def make_etag(*parts) -> str:
+    """Build a strong ETag from the values that identify a representation"""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def product_etag(product: dict) -> str:
+    """ETag for a product document; scan_count is part of the response body"""
+    return make_etag(product["product_id"], product["updated_at"].isoformat(), product.get("scan_count", 0))
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against an ETag (weak comparison per RFC 9110)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def set_cache_headers(response: Response, etag: str, cache_control: str):
+    """Attach validator and caching headers to a response"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """Empty 304 response carrying the current validators"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": cache_control}
+    )
+
+def conditional_response(
+    request: Request, response: Response, etag: str, cache_control: str
+) -> Optional[Response]:
+    """
+    Return a 304 response if the client already has this representation,
+    otherwise set caching headers on the outgoing response and return None.
+    """
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    set_cache_headers(response, etag, cache_control)
+    return None
@@ -0,0 +1,39 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.metrics import http_request_duration, http_requests
+import time
+
+class MetricsMiddleware:
+    """
+    Record latency and status of every HTTP request.
+
+    Requests are labelled with the route's path template
+    ("/api/scans/{scan_id}"), which the router leaves in the scope, so
+    label cardinality stays bounded by the number of routes. Requests that
+    never reached a route (404s, rejected before routing) are "unmatched".
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            http_request_duration.labels(method, path).observe(time.perf_counter() - started)
+            http_requests.inc(method, path, str(status_code))
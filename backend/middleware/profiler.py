@@ -0,0 +1,226 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import asyncio
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9.-]+")
+# Frame file names are shown relative to these
+PATH_MARKERS = ("site-packages" + os.sep, "backend" + os.sep, os.path.dirname(os.__file__) + os.sep)
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    # Keep paths short: relative to site-packages, the backend or the stdlib
+    for marker in PATH_MARKERS:
+        index = filename.rfind(marker)
+        if index != -1:
+            filename = filename[index + len(marker):]
+            break
+    # ";" separates frames in the folded format
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+class _Profile:
+    """Samples collected for one request"""
+
+    def __init__(self, name: str, task: asyncio.Task, loop: asyncio.AbstractEventLoop, thread_id: int):
+        self.name = name
+        self.task = task
+        self.loop = loop
+        self.thread_id = thread_id
+        # stack -> microseconds attributed to it
+        self.stacks: Counter = Counter()
+        self.last_sample = time.perf_counter()
+
+class RequestProfiler:
+    """
+    Wall-clock sampling profiler for individual requests.
+
+    A background thread wakes every `interval` seconds while at least one
+    request is being profiled and records the stack of each profiled task:
+
+    - if the task is running, the event loop thread's real stack below the
+      task's outermost coroutine (so synchronous work such as
+      IngredientEngine.score_product shows up)
+    - if the task is suspended, its chain of awaiting coroutines ending in
+      "[waiting at file:line]" (time spent awaiting Mongo, OCR, ...)
+
+    Each sample is weighted by the wall time since the previous one: a busy
+    event loop only lets the sampler in at GIL switch intervals, so equal
+    weights would under-count CPU-bound stretches.
+
+    Results are written in Brendan Gregg's folded format, one
+    "frame;frame;frame microseconds" line per distinct stack, which
+    flamegraph.pl, speedscope and inferno read directly.
+    """
+
+    def __init__(self, output_dir: str, interval: float = 0.005):
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self._active: Dict[int, _Profile] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(self, label: str) -> _Profile:
+        """
+        Start sampling the current task.
+
+        Args:
+            label: Describes the request; part of the output file name
+        """
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{label}-{uuid.uuid4().hex[:8]}.folded"
+        profile = _Profile(name, asyncio.current_task(), asyncio.get_running_loop(), threading.get_ident())
+        with self._lock:
+            self._active[id(profile)] = profile
+            self._wakeup.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def end(self, profile: _Profile):
+        with self._lock:
+            self._active.pop(id(profile), None)
+
+    def _sample_loop(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                profiles = list(self._active.values())
+                if not profiles:
+                    # Under the lock, so a concurrent begin() cannot be missed
+                    self._wakeup.clear()
+            if not profiles:
+                continue
+
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            for profile in profiles:
+                try:
+                    stack = self._sample(profile, frames)
+                except Exception:
+                    # The task changed under us; skip this sample
+                    continue
+                if stack:
+                    profile.stacks[stack] += int((now - profile.last_sample) * 1e6)
+                profile.last_sample = now
+            del frames
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _sample(profile: _Profile, frames: Dict) -> Optional[str]:
+        coro = profile.task.get_coro()
+        root = getattr(coro, "cr_frame", None)
+        if root is None:
+            return None
+
+        if asyncio.current_task(profile.loop) is profile.task:
+            # Running: walk the thread's stack up to the task's outermost coroutine
+            names: List[str] = []
+            frame = frames.get(profile.thread_id)
+            while frame is not None:
+                names.append(_frame_name(frame))
+                if frame is root:
+                    break
+                frame = frame.f_back
+            return ";".join(reversed(names))
+
+        # Suspended: follow the await chain down to what it is waiting on
+        names = []
+        innermost = None
+        while coro is not None:
+            frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+            if frame is None:
+                break
+            names.append(_frame_name(frame))
+            innermost = frame
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+        if innermost is not None:
+            location = _frame_name(innermost).rsplit("(", 1)[-1].rsplit(":", 1)[0]
+            names.append(f"[waiting at {location}:{innermost.f_lineno}]")
+        return ";".join(names)
+
+    def write(self, profile: _Profile) -> Path:
+        """
+        Save a request's samples.
+
+        The file is written even when nothing was sampled (requests that
+        finish within one interval), so the name sent in X-Profile always
+        exists; an empty file means the request was too fast to sample.
+
+        Returns:
+            Path of the folded-stack file
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / profile.name
+        with open(path, "w") as f:
+            for stack, count in profile.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+class ProfilerMiddleware:
+    """
+    Profile a sample of requests, or any request carrying the admin header.
+
+    A request is profiled if `X-Profile` matches `token`, or with
+    probability `sample_rate`. The folded-stack file name is returned in
+    the X-Profile response header. Install it innermost (add it to the app
+    first): BaseHTTPMiddleware runs the rest of the app in a separate task,
+    and only the task running the route is sampled.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: RequestProfiler, sample_rate: float = 0.0, token: str = ""):
+        self.app = app
+        self.profiler = profiler
+        self.sample_rate = sample_rate
+        self.token = token.encode()
+
+    def _requested(self, scope: Scope) -> bool:
+        if not self.token:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = self._requested(scope)
+        if not requested and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        label = UNSAFE_FILENAME_CHARS.sub("_", f"{scope['method']}{scope['path']}").strip("_")[:80]
+        profile = self.profiler.begin(label)
+
+        async def send_with_profile(message: Message):
+            if requested and message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (PROFILE_HEADER, profile.name.encode())]}
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            self.profiler.end(profile)
+            duration = time.perf_counter() - started
+            loop = asyncio.get_running_loop()
+            path = await loop.run_in_executor(None, self.profiler.write, profile)
+            logger.info(f"Profiled {scope['method']} {scope['path']} ({duration * 1000:.0f} ms): {path}")
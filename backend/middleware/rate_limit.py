@@ -1,35 +1,274 @@
 from fastapi import Request, HTTPException, status
-from datetime import datetime, timedelta
-from collections import defaultdict
+from jose import JWTError
+from starlette.routing import Match
+from collections import OrderedDict
+from config.env import settings
+from middleware.auth import decode_access_token
+from middleware.rate_limit_backends import RateLimitBackend, WindowDeltas
+from services.cache import LRUCache
+from typing import Dict, Iterable, Optional
 import asyncio
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+class RouteLimit:
+    """Rate-limit policy declared by a route"""
+
+    __slots__ = ("cost", "bucket", "exempt")
+
+    def __init__(self, cost: int = 1, bucket: str = "default", exempt: bool = False):
+        self.cost = cost
+        self.bucket = bucket
+        self.exempt = exempt
+
+DEFAULT_ROUTE_LIMIT = RouteLimit()
+EXEMPT_ROUTE_LIMIT = RouteLimit(exempt=True)
+
+# Routes FastAPI registers itself (OpenAPI schema and interactive docs)
+EXEMPT_PATHS = {"/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json"}
+
+def rate_limit(cost: int = 1, bucket: str = "default", exempt: bool = False):
+    """
+    Declare the rate-limit policy of a route.
+    Place it below the router decorator:
+
+        @router.post("/image")
+        @rate_limit(cost=10, bucket="scan")
+        async def scan_by_image(...):
+
+    Args:
+        cost: Units charged per request against the bucket's per-minute budget
+        bucket: Budget the cost is charged to; each bucket is counted separately
+        exempt: Skip rate limiting entirely
+    """
+    def decorator(endpoint):
+        endpoint.rate_limit = EXEMPT_ROUTE_LIMIT if exempt else RouteLimit(cost, bucket)
+        return endpoint
+    return decorator
 
 class RateLimiter:
-    def __init__(self, requests_per_minute: int = 60):
+    """
+    Sliding-window-counter rate limiter.
+
+    Each client keeps only two counters (the current and the previous fixed
+    window). The request rate is estimated as
+    previous * (portion of the previous window still in range) + current,
+    which is O(1) per request.
+
+    State lives in an OrderedDict kept in LRU order: clients idle for more
+    than two windows are evicted, and the table never exceeds max_clients.
+    check_rate_limit never awaits, so it is atomic on the event loop and
+    needs no lock.
+
+    With a shared backend, allowed hits are also queued as deltas and
+    flushed every flush_interval seconds in one round trip; the reply
+    refreshes the local counters with the totals from all workers. If the
+    backend is unreachable the limiter keeps enforcing per-worker limits.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 60,
+        window_seconds: float = 60.0,
+        max_clients: int = 100000,
+        backend: Optional[RateLimitBackend] = None,
+        flush_interval: float = 0.05,
+        bucket_limits: Optional[Dict[str, int]] = None
+    ):
         self.requests_per_minute = requests_per_minute
-        self.requests = defaultdict(list)
-        self.lock = asyncio.Lock()
-    
-    async def check_rate_limit(self, request: Request):
-        """Check if request exceeds rate limit"""
-        client_ip = request.client.host
-        now = datetime.utcnow()
+        # Budgets for named buckets; anything else uses requests_per_minute
+        self.bucket_limits = bucket_limits or {}
+        self.window_seconds = window_seconds
+        self.max_clients = max_clients
+        self.backend = backend
+        self.flush_interval = flush_interval
+        # key -> [window_start, current_count, previous_count, last_seen]
+        self.clients: "OrderedDict[str, list]" = OrderedDict()
+        self._pending: WindowDeltas = {}
+        self._flusher: Optional[asyncio.Task] = None
+        # bucket -> requests rejected with 429
+        self.rejections: Dict[str, int] = {}
+        # (method, path) -> RouteLimit
+        self._route_limits = LRUCache(maxsize=4096, name="rate_limit_routes")
+
+    def hit(self, key: str, cost: int = 1, limit: Optional[int] = None, now: Optional[float] = None) -> bool:
+        """
+        Charge cost units to key.
+
+        Returns:
+            False (and charges nothing) if the charge would exceed limit
+        """
+        now = time.time() if now is None else now
+        limit = self.requests_per_minute if limit is None else limit
+        window = self.window_seconds
+        window_start = now - (now % window)
+
+        state = self.clients.get(key)
+        if state is None:
+            state = [window_start, 0, 0, now]
+            self.clients[key] = state
+        else:
+            self.clients.move_to_end(key)
+            if state[0] != window_start:
+                # Roll windows; anything older than one window is dropped
+                state[2] = state[1] if window_start - state[0] == window else 0
+                state[1] = 0
+                state[0] = window_start
+        state[3] = now
+
+        self._evict(now)
+
+        elapsed_fraction = (now - window_start) / window
+        estimated = state[2] * (1 - elapsed_fraction) + state[1]
+
+        if estimated + cost > limit:
+            return False
+
+        state[1] += cost
+        if self.backend is not None:
+            pending_key = (key, window_start)
+            self._pending[pending_key] = self._pending.get(pending_key, 0) + cost
+        return True
+
+    def _evict(self, now: float):
+        """Drop least recently seen clients that are idle or over capacity"""
+        idle_cutoff = now - 2 * self.window_seconds
+        clients = self.clients
+        while clients:
+            key, state = next(iter(clients.items()))
+            if len(clients) > self.max_clients or state[3] < idle_cutoff:
+                clients.popitem(last=False)
+            else:
+                break
+
+    async def flush(self):
+        """Send queued hits to the shared backend and apply global totals"""
+        if self.backend is None or not self._pending:
+            return
+
+        deltas, self._pending = self._pending, {}
+        try:
+            totals = await self.backend.sync(deltas, self.window_seconds)
+        except Exception as e:
+            # Local counters already include these hits; keep limiting per worker
+            logger.warning(f"Rate limit backend sync failed: {e}")
+            return
+
+        for (key, window_start), (current_total, previous_total) in totals.items():
+            state = self.clients.get(key)
+            if state is None or state[0] != window_start:
+                continue
+            # Hits recorded while the sync was in flight are still pending
+            state[1] = current_total + self._pending.get((key, window_start), 0)
+            state[2] = previous_total
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def validate_routes(self, routes: Iterable):
+        """
+        Reject budgets smaller than the cost of a route charged to them;
+        such a route would answer 429 to every request.
         
-        async with self.lock:
-            # Clean old requests
-            self.requests[client_ip] = [
-                req_time for req_time in self.requests[client_ip]
-                if now - req_time < timedelta(minutes=1)
-            ]
-            
-            # Check limit
-            if len(self.requests[client_ip]) >= self.requests_per_minute:
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail="Too many requests. Please try again later."
+        Raises:
+            ValueError: Naming the first route that can never be served
+        """
+        for route in routes:
+            limit = getattr(getattr(route, "endpoint", None), "rate_limit", DEFAULT_ROUTE_LIMIT)
+            if limit.exempt:
+                continue
+            budget = self.bucket_limits.get(limit.bucket, self.requests_per_minute)
+            if limit.cost > budget:
+                raise ValueError(
+                    f"Rate limit for bucket '{limit.bucket}' is {budget} per window, "
+                    f"but {getattr(route, 'path', route)} costs {limit.cost}"
                 )
-            
-            # Add current request
-            self.requests[client_ip].append(now)
+    
+    async def start(self):
+        """Start periodic flushing when a shared backend is configured"""
+        if self.backend is not None and self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self.backend is not None:
+            await self.flush()
+            await self.backend.close()
+
+    def route_limit(self, request: Request) -> RouteLimit:
+        """Find the policy of the route that will handle the request"""
+        if request.method == "OPTIONS" or request.url.path in EXEMPT_PATHS:
+            return EXEMPT_ROUTE_LIMIT
+
+        cache_key = (request.method, request.url.path)
+        limit = self._route_limits.get(cache_key)
+        if limit is not None:
+            return limit
+
+        # Same first-full-match rule the router uses, before any body is read
+        limit = DEFAULT_ROUTE_LIMIT
+        for route in request.app.router.routes:
+            match, _ = route.matches(request.scope)
+            if match == Match.FULL:
+                limit = getattr(route.endpoint, "rate_limit", DEFAULT_ROUTE_LIMIT)
+                break
+
+        self._route_limits.set(cache_key, limit)
+        return limit
+
+    @staticmethod
+    def client_key(request: Request) -> str:
+        """Authenticated callers are limited per user, everyone else per IP"""
+        authorization = request.headers.get("authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                user_id = decode_access_token(token).get("sub")
+                if user_id:
+                    return f"user:{user_id}"
+            except JWTError:
+                pass
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    async def check_rate_limit(self, request: Request):
+        """Charge the request to its route's bucket; raises 429 when over budget"""
+        limit = self.route_limit(request)
+        if limit.exempt:
+            return
+
+        key = f"{limit.bucket}:{self.client_key(request)}"
+        now = time.time()
+        if not self.hit(key, limit.cost, self.bucket_limits.get(limit.bucket), now):
+            self.rejections[limit.bucket] = self.rejections.get(limit.bucket, 0) + 1
+            retry_after = math.ceil(self.window_seconds - now % self.window_seconds)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests. Please try again later.",
+                headers={"Retry-After": str(retry_after)}
+            )
+
+def create_backend() -> Optional[RateLimitBackend]:
+    """Build the configured shared backend (None keeps state per worker)"""
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        from middleware.rate_limit_backends import RedisRateLimitBackend
+        return RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+    return None
 
 # Global rate limiter instance
-rate_limiter = RateLimiter(requests_per_minute=60)
\ No newline at end of file
+rate_limiter = RateLimiter(
+    requests_per_minute=settings.RATE_LIMIT_PER_MINUTE,
+    backend=create_backend(),
+    flush_interval=settings.RATE_LIMIT_FLUSH_INTERVAL,
+    bucket_limits={
+        "auth": settings.RATE_LIMIT_AUTH_PER_MINUTE,
+        "scan": settings.RATE_LIMIT_SCAN_PER_MINUTE,
+        "bulk": settings.RATE_LIMIT_BULK_PER_MINUTE
+    }
+)
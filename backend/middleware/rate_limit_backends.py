@@ -0,0 +1,68 @@
+from typing import Dict, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (client key, window start) -> count
+WindowDeltas = Dict[Tuple[str, float], int]
+# (client key, window start) -> (current window total, previous window total)
+WindowTotals = Dict[Tuple[str, float], Tuple[int, int]]
+
+class RateLimitBackend:
+    """
+    Shared store for rate-limit counters.
+
+    Workers count requests locally and periodically call sync() with the
+    hits accumulated since the last call; the backend adds them to the
+    shared counters and returns the global totals for those windows.
+    """
+
+    async def sync(self, deltas: WindowDeltas, window_seconds: float) -> WindowTotals:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Redis-protocol backend.
+
+    Works with a real Redis server or with middleware.rate_limit_server,
+    a tiny RESP server meant for single-host multi-worker deployments
+    (over a Unix socket) and for local testing.
+
+    Args:
+        url: redis://host:port/db or unix:///path/to/socket
+    """
+
+    def __init__(self, url: str, key_prefix: str = "rl"):
+        import redis.asyncio as redis
+
+        self.key_prefix = key_prefix
+        self.client = redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
+
+    def _key(self, client_key: str, window_start: float) -> str:
+        return f"{self.key_prefix}:{client_key}:{int(window_start)}"
+
+    async def sync(self, deltas: WindowDeltas, window_seconds: float) -> WindowTotals:
+        if not deltas:
+            return {}
+
+        ttl = int(window_seconds * 2) + 1
+        pipe = self.client.pipeline(transaction=False)
+        for (client_key, window_start), delta in deltas.items():
+            current = self._key(client_key, window_start)
+            pipe.incrby(current, delta)
+            pipe.expire(current, ttl)
+            pipe.get(self._key(client_key, window_start - window_seconds))
+
+        replies = await pipe.execute()
+
+        totals = {}
+        for index, window in enumerate(deltas):
+            current_total, _, previous_total = replies[index * 3:index * 3 + 3]
+            totals[window] = (int(current_total), int(previous_total or 0))
+        return totals
+
+    async def close(self):
+        await self.client.aclose()
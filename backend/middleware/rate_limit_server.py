@@ -0,0 +1,150 @@
+"""
+Minimal Redis-protocol (RESP) counter server for shared rate limiting.
+
+Implements only what RedisRateLimitBackend needs (PING, GET, INCRBY,
+EXPIRE, DEL). Run it next to the API on a single host and point every
+uvicorn worker at it:
+
+    python -m middleware.rate_limit_server --unix /tmp/hair-scanner-ratelimit.sock
+    RATE_LIMIT_BACKEND=redis RATE_LIMIT_REDIS_URL=unix:///tmp/hair-scanner-ratelimit.sock
+
+It also serves as a local stand-in for Redis when testing (--port).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class RespCounterServer:
+    """In-memory key/value store with TTLs, spoken to over RESP"""
+
+    def __init__(self, sweep_interval: float = 30.0):
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.sweep_interval = sweep_interval
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, unix_path: Optional[str] = None):
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.unlink(unix_path)
+            self._server = await asyncio.start_unix_server(self._handle, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        self._sweeper = asyncio.create_task(self._sweep())
+        return self
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            now = time.monotonic()
+            expired = [key for key, (_, expires_at) in self.data.items() if expires_at and expires_at <= now]
+            for key in expired:
+                del self.data[key]
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args: List[bytes]) -> bytes:
+        """Run one command and return the encoded RESP reply"""
+        command = args[0].upper()
+
+        if command == b"PING":
+            return b"+PONG\r\n"
+
+        if command == b"GET" and len(args) == 2:
+            value = self._get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+        if command in (b"INCR", b"INCRBY") and len(args) in (2, 3):
+            try:
+                amount = int(args[2]) if len(args) == 3 else 1
+                value = int(self._get(args[1]) or 0) + amount
+            except ValueError:
+                return b"-ERR value is not an integer or out of range\r\n"
+            expires_at = self.data.get(args[1], (None, None))[1]
+            self.data[args[1]] = (str(value).encode(), expires_at)
+            return b":%d\r\n" % value
+
+        if command == b"EXPIRE" and len(args) == 3:
+            value = self._get(args[1])
+            if value is None:
+                return b":0\r\n"
+            self.data[args[1]] = (value, time.monotonic() + int(args[2]))
+            return b":1\r\n"
+
+        if command == b"DEL":
+            removed = sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+            return b":%d\r\n" % removed
+
+        if command == b"CLIENT":
+            # Connection handshake sent by redis-py
+            return b"+OK\r\n"
+
+        return b"-ERR unknown command '%s'\r\n" % args[0]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                writer.write(self.execute(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command (e.g. from telnet / redis-cli)
+            return line.strip().split()
+
+        args = []
+        for _ in range(int(line[1:].strip())):
+            header = await reader.readline()
+            length = int(header[1:].strip())
+            payload = await reader.readexactly(length + 2)
+            args.append(payload[:-2])
+        return args
+
+async def _serve(args):
+    server = await RespCounterServer().start(host=args.host, port=args.port, unix_path=args.unix)
+    location = args.unix or f"{args.host}:{server.port}"
+    logger.info(f"Rate limit counter server listening on {location}")
+    await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unix", help="Unix socket path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    asyncio.run(_serve(parser.parse_args()))
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from passlib.context import CryptContext
 from config.db import get_database
 from middleware.auth import create_access_token, get_current_user
+from middleware.rate_limit import rate_limit
+from services.password_service import password_service, PasswordHasherBusy
+from services.scan_stats_service import empty_scan_stats
 from .models import UserRegister, UserLogin, Token, UserResponse
 import uuid
 from datetime import datetime
@@ -10,16 +12,28 @@ import logging
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy. Please try again shortly.",
+        headers={"Retry-After": "1"}
+    )
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    try:
+        return await password_service.hash(password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str):
+    """Returns (valid, new_hash); new_hash is set when the bcrypt cost changed"""
+    try:
+        return await password_service.verify(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
+@rate_limit(bucket="auth")
 async def register(user_data: UserRegister):
     """Register a new user"""
     db = get_database()
@@ -34,13 +48,14 @@ async def register(user_data: UserRegister):
     
     # Create new user
     user_id = str(uuid.uuid4())
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     
     user_doc = {
         "user_id": user_id,
         "email": user_data.email,
         "full_name": user_data.full_name,
         "hashed_password": hashed_password,
+        "scan_stats": empty_scan_stats(),
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
@@ -58,6 +73,7 @@ async def register(user_data: UserRegister):
     )
 
 @router.post("/login", response_model=Token)
+@rate_limit(bucket="auth")
 async def login(user_data: UserLogin):
     """Login user"""
     db = get_database()
@@ -71,12 +87,20 @@ async def login(user_data: UserLogin):
         )
     
     # Verify password
-    if not verify_password(user_data.password, user["hashed_password"]):
+    valid, new_hash = await verify_password(user_data.password, user["hashed_password"])
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
     
+    # Upgrade hashes made with a different bcrypt cost
+    if new_hash:
+        await db.users.update_one(
+            {"user_id": user["user_id"]},
+            {"$set": {"hashed_password": new_hash, "updated_at": datetime.utcnow()}}
+        )
+    
     # Create access token
     access_token = create_access_token(data={"sub": user["user_id"]})
     
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Query
-from config.db import get_database
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from engine.engine import engine
+from middleware.http_cache import make_etag, conditional_response, INGREDIENT_CACHE_CONTROL
 from .models import IngredientResponse
 from typing import List
 import logging
@@ -7,60 +8,45 @@ import logging
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/ingredients", tags=["Ingredients"])
 
+# All ingredient reads are served from the engine's in-memory index
+
 @router.get("/search", response_model=List[IngredientResponse])
 async def search_ingredients(
     q: str = Query(..., description="Search query"),
     limit: int = Query(20, ge=1, le=100)
 ):
-    """Search ingredients by name"""
-    db = get_database()
-    
-    cursor = db.ingredients.find(
-        {"name": {"$regex": q.lower(), "$options": "i"}}
-    ).limit(limit)
-    
-    ingredients = await cursor.to_list(length=limit)
-    
-    # Remove MongoDB _id field
-    for ing in ingredients:
-        ing.pop("_id", None)
-    
-    return ingredients
+    """Autocomplete ingredients by name or alias prefix"""
+    return engine.ingredient_index.search(q, limit=limit)
 
 @router.get("/{name}", response_model=IngredientResponse)
-async def get_ingredient(name: str):
-    """Get ingredient by exact name"""
-    db = get_database()
+async def get_ingredient(name: str, request: Request, response: Response):
+    """Get ingredient by exact name or alias"""
+    etag = make_etag(engine.ingredient_version, "ingredient", name.lower().strip())
+    cached = conditional_response(request, response, etag, INGREDIENT_CACHE_CONTROL)
+    if cached:
+        return cached
     
-    ingredient = await db.ingredients.find_one({"name": name.lower()})
+    ingredient = engine.ingredient_index.get(name)
     
     if not ingredient:
-        from fastapi import HTTPException, status
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Ingredient '{name}' not found"
         )
     
-    ingredient.pop("_id", None)
     return ingredient
 
 @router.get("", response_model=List[IngredientResponse])
 async def list_ingredients(
+    request: Request,
+    response: Response,
     category: str = Query(None, description="Filter by category"),
     limit: int = Query(50, ge=1, le=200)
 ):
     """List all ingredients with optional category filter"""
-    db = get_database()
-    
-    query = {}
-    if category:
-        query["category"] = category.lower()
-    
-    cursor = db.ingredients.find(query).limit(limit)
-    ingredients = await cursor.to_list(length=limit)
-    
-    # Remove MongoDB _id field
-    for ing in ingredients:
-        ing.pop("_id", None)
+    etag = make_etag(engine.ingredient_version, "list", (category or "").lower(), limit)
+    cached = conditional_response(request, response, etag, INGREDIENT_CACHE_CONTROL)
+    if cached:
+        return cached
     
-    return ingredients
\ No newline at end of file
+    return engine.ingredient_index.list(category=category, limit=limit)
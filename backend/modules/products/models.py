@@ -22,10 +22,23 @@ class ProductResponse(BaseModel):
     product_id: str
     name: str
     brand: Optional[str]
-    barcode: Optional[str]
+    barcode: Optional[str] = None
     category: str
     ingredients_text: str
     image_url: Optional[str]
     created_at: datetime
     updated_at: datetime
-    scan_count: int = 0
\ No newline at end of file
+    scan_count: int = 0
+
+class ProductImportError(BaseModel):
+    row: int
+    error: str
+
+class ProductImportReport(BaseModel):
+    rows: int
+    inserted: int
+    duplicates: int
+    error_count: int
+    errors: List[ProductImportError]
+    elapsed_seconds: float
+    rows_per_second: float
\ No newline at end of file
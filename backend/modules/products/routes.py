@@ -1,7 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
 from config.db import get_database
 from middleware.auth import get_current_user
-from .models import ProductCreate, ProductUpdate, ProductResponse
+from middleware.http_cache import (
+    product_etag,
+    etag_matches,
+    set_cache_headers,
+    not_modified,
+    PRODUCT_CACHE_CONTROL
+)
+from middleware.rate_limit import rate_limit
+from services.barcode_service import barcode_service
+from services.export_service import export_service, NDJSON_MEDIA_TYPE
+from services.product_search import product_search_service, build_search_keys
+from .models import ProductCreate, ProductUpdate, ProductResponse, ProductImportReport
 import uuid
 from datetime import datetime
 from typing import List, Optional
@@ -10,6 +22,31 @@ import logging
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/products", tags=["Products"])
 
+# Just enough of a product to compute its ETag
+ETAG_PROJECTION = {"_id": 0, "product_id": 1, "updated_at": 1, "scan_count": 1}
+
+async def _find_product_conditional(query: dict, request: Request, response: Response):
+    """
+    Fetch a product honouring If-None-Match.
+    Revalidation only reads the ETag fields; the full document is loaded
+    only when the client's copy is stale.
+    
+    Returns (product, not_modified_response); exactly one is set unless
+    the product does not exist.
+    """
+    db = get_database()
+    
+    if request.headers.get("if-none-match"):
+        validators = await db.products.find_one(query, ETAG_PROJECTION)
+        if validators and etag_matches(request, product_etag(validators)):
+            return None, not_modified(product_etag(validators), PRODUCT_CACHE_CONTROL)
+    
+    product = await db.products.find_one(query)
+    if product:
+        set_cache_headers(response, product_etag(product), PRODUCT_CACHE_CONTROL)
+    
+    return product, None
+
 @router.post("", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_data: ProductCreate,
@@ -33,27 +70,91 @@ async def create_product(
         "product_id": product_id,
         "name": product_data.name,
         "brand": product_data.brand,
-        "barcode": product_data.barcode,
         "category": product_data.category,
         "ingredients_text": product_data.ingredients_text,
         "image_url": product_data.image_url,
+        "search_keys": build_search_keys(product_data.name, product_data.brand),
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
         "scan_count": 0,
         "created_by": current_user["user_id"]
     }
+    # The unique sparse barcode index still indexes explicit nulls
+    if product_data.barcode:
+        product_doc["barcode"] = product_data.barcode
     
     await db.products.insert_one(product_doc)
+    barcode_service.invalidate(product_data.barcode)
     logger.info(f"Product created: {product_data.name}")
     
     return ProductResponse(**product_doc)
 
+@router.post("/import", response_model=ProductImportReport)
+@rate_limit(cost=30, bucket="bulk")
+async def import_products(
+    file: UploadFile = File(..., description="CSV (with header) or NDJSON product catalog"),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Defaults to the file extension"),
+    precompute_scores: bool = Query(False, description="Store engine results for every porosity/scalp combination; barcode scans reuse them"),
+    batch_size: int = Query(1000, ge=100, le=10000),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Bulk import products from a streamed CSV or NDJSON upload.
+    Rows with errors are skipped and reported; valid rows are imported.
+    """
+    from services.product_import import (
+        import_products as run_import,
+        iter_upload_lines,
+        parse_csv,
+        parse_ndjson,
+        detect_format
+    )
+    
+    file_format = format or detect_format(file.filename, file.content_type)
+    parse = parse_ndjson if file_format == "ndjson" else parse_csv
+    
+    report = await run_import(
+        parse(iter_upload_lines(file)),
+        batch_size=batch_size,
+        precompute_scores=precompute_scores,
+        created_by=current_user["user_id"]
+    )
+    
+    logger.info(f"Product import by {current_user['user_id']}: {report['inserted']} inserted")
+    
+    return report
+
+@router.get("/export")
+@rate_limit(cost=10, bucket="bulk")
+async def export_products(
+    category: Optional[str] = None,
+    created_from: Optional[datetime] = Query(None, description="Inclusive lower bound on created_at"),
+    created_to: Optional[datetime] = Query(None, description="Exclusive upper bound on created_at"),
+    after: Optional[str] = Query(None, description="Resume after this product_id"),
+    batch_size: int = Query(1000, ge=100, le=10000),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream the product catalog as NDJSON, ordered by product_id.
+    To resume an interrupted export, pass the last product_id received as `after`.
+    """
+    return StreamingResponse(
+        export_service.export_products(
+            category=category,
+            created_from=created_from,
+            created_to=created_to,
+            after=after,
+            batch_size=batch_size
+        ),
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
 @router.get("/barcode/{barcode}", response_model=ProductResponse)
-async def get_product_by_barcode(barcode: str):
+async def get_product_by_barcode(barcode: str, request: Request, response: Response):
     """Get product by barcode"""
-    db = get_database()
-    
-    product = await db.products.find_one({"barcode": barcode})
+    product, cached = await _find_product_conditional({"barcode": barcode}, request, response)
+    if cached:
+        return cached
     
     if not product:
         raise HTTPException(
@@ -69,30 +170,17 @@ async def search_products(
     category: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100)
 ):
-    """Search products by name or brand"""
-    db = get_database()
-    
-    query = {
-        "$or": [
-            {"name": {"$regex": q, "$options": "i"}},
-            {"brand": {"$regex": q, "$options": "i"}}
-        ]
-    }
-    
-    if category:
-        query["category"] = category
-    
-    cursor = db.products.find(query).limit(limit)
-    products = await cursor.to_list(length=limit)
+    """Search products by name or brand, ranked by relevance"""
+    products = await product_search_service.search(q, category=category, limit=limit)
     
     return [ProductResponse(**p) for p in products]
 
 @router.get("/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: str):
+async def get_product(product_id: str, request: Request, response: Response):
     """Get product by ID"""
-    db = get_database()
-    
-    product = await db.products.find_one({"product_id": product_id})
+    product, cached = await _find_product_conditional({"product_id": product_id}, request, response)
+    if cached:
+        return cached
     
     if not product:
         raise HTTPException(
@@ -135,12 +223,22 @@ async def update_product(
     if product_update.image_url:
         update_data["image_url"] = product_update.image_url
     
-    await db.products.update_one(
-        {"product_id": product_id},
-        {"$set": update_data}
-    )
+    # Keep search keys in sync with name/brand
+    if "name" in update_data or "brand" in update_data:
+        update_data["search_keys"] = build_search_keys(
+            update_data.get("name", product["name"]),
+            update_data.get("brand", product.get("brand"))
+        )
+    
+    update = {"$set": update_data}
+    # Precomputed engine results describe the old ingredient list
+    if "ingredients_text" in update_data:
+        update["$unset"] = {"precomputed_scores": ""}
+    
+    await db.products.update_one({"product_id": product_id}, update)
     
     updated_product = await db.products.find_one({"product_id": product_id})
+    barcode_service.invalidate(product.get("barcode"), updated_product.get("barcode"))
     
     logger.info(f"Product updated: {product_id}")
     
@@ -154,13 +252,18 @@ async def delete_product(
     """Delete product"""
     db = get_database()
     
-    result = await db.products.delete_one({"product_id": product_id})
+    deleted = await db.products.find_one_and_delete(
+        {"product_id": product_id},
+        projection={"barcode": 1}
+    )
     
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
     
+    barcode_service.invalidate(deleted.get("barcode"))
+    
     logger.info(f"Product deleted: {product_id}")
     return None
\ No newline at end of file
@@ -11,6 +11,9 @@ class ScanByIngredients(BaseModel):
 class ScanByBarcode(BaseModel):
     barcode: str = Field(..., description="Product barcode/UPC")
 
+class ScanByBarcodeBatch(BaseModel):
+    barcodes: List[str] = Field(..., min_length=1, max_length=50, description="Product barcodes/UPCs")
+
 class ScanByImage(BaseModel):
     image_base64: str = Field(..., description="Base64 encoded image")
     product_name: Optional[str] = None
@@ -49,6 +52,37 @@ class ScanResult(BaseModel):
     # Timestamps
     created_at: datetime
 
+class BarcodeBatchItem(BaseModel):
+    barcode: str
+    found: bool
+    scan: Optional[ScanResult] = None
+
+class BarcodeBatchResponse(BaseModel):
+    results: List[BarcodeBatchItem]
+    found: int
+    not_found: int
+
+class ScanJob(BaseModel):
+    """Background scan job; result is set once status is completed"""
+    job_id: str
+    job_type: str
+    status: str = Field(..., description="queued, processing, completed or failed")
+    result: Optional[ScanResult] = None
+    error: Optional[str] = None
+    error_status: Optional[int] = Field(None, description="HTTP status the synchronous endpoint would have returned")
+    created_at: datetime
+    updated_at: datetime
+
+class ScanSummary(BaseModel):
+    """Lightweight scan record for history listings"""
+    scan_id: str
+    scan_type: str
+    product_name: Optional[str] = None
+    product_brand: Optional[str] = None
+    verdict: str
+    overall_score: int
+    created_at: datetime
+
 class ScanHistoryResponse(BaseModel):
     scans: List[ScanResult]
     total: int
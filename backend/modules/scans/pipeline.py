@@ -0,0 +1,207 @@
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+from config.db import get_database
+from services.scoring_service import scoring_service, MISSING_PROFILE_ERROR
+from services.scan_stats_service import scan_stats_service
+from services.latency import Histogram
+from services.metrics import registry
+from .serialization import scan_response
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterator
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# In execution order; also the order of the Server-Timing entries
+SCAN_STAGES = ("acquire", "profile", "score", "persist", "respond")
+
+scan_stage_duration = registry.histogram(
+    "scan_stage_duration_seconds",
+    "Scan pipeline time by stage (acquire, profile, score, persist, respond)",
+    ("stage",)
+)
+
+# Product fields a text source may carry; missing ones are stored as None
+SOURCE_PRODUCT_FIELDS = ("product_name", "product_brand", "product_category", "product_id")
+
+class ScanTimings:
+    """Stage durations of one scan request"""
+
+    def __init__(self, histograms: Dict[str, Histogram]):
+        self._histograms = histograms
+        self.durations: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.durations[name] = elapsed
+            self._histograms[name].observe(elapsed)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. "acquire;dur=0.1, profile;dur=1.9, ..." (ms)"""
+        return ", ".join(
+            f"{name};dur={self.durations[name] * 1000:.1f}"
+            for name in SCAN_STAGES if name in self.durations
+        )
+
+def build_scan_doc(user_id: str, scan_type: str, source: Dict, result: Dict) -> Dict:
+    """
+    Build the scan record stored in the scans collection.
+
+    Args:
+        user_id: Owner of the scan
+        scan_type: ingredients, barcode or image
+        source: Acquired text and product info (ingredients_text, optional
+            product_* fields, barcode and precomputed_scores)
+        result: Engine result with the hair profile snapshot
+
+    Returns:
+        Scan document
+    """
+    scan_doc = {
+        "scan_id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "scan_type": scan_type,
+
+        # Product info
+        **{field: source.get(field) for field in SOURCE_PRODUCT_FIELDS},
+        "ingredients_text": source["ingredients_text"],
+
+        # Scoring results
+        "verdict": result["verdict"],
+        "overall_score": result["overall_score"],
+        "moisture_score": result["moisture_score"],
+        "buildup_risk": result["buildup_risk"],
+        "scalp_score": result["scalp_score"],
+        "water_based": result["water_based"],
+        "heavy_oils": result["heavy_oils"],
+        "protein_heavy": result["protein_heavy"],
+        "explanation": result["explanation"],
+
+        # Metadata
+        "matched_ingredients_count": result["matched_ingredients_count"],
+        "total_ingredients_count": result["total_ingredients_count"],
+
+        # Hair profile used
+        "hair_profile": result["hair_profile"],
+
+        # Timestamps
+        "created_at": datetime.utcnow()
+    }
+    if source.get("barcode"):
+        scan_doc["barcode"] = source["barcode"]
+    return scan_doc
+
+class ScanPipeline:
+    """
+    The steps every single scan goes through, in order:
+
+    - acquire: get ingredient text (request body, barcode lookup or OCR)
+    - profile: load the user's hair profile
+    - score: run the ingredient engine
+    - persist: store the scan, update stats and product scan counts
+    - respond: serialize the response
+
+    Each stage is timed per request (Server-Timing header) and aggregated
+    in a histogram per stage for the whole process.
+    """
+
+    def __init__(self):
+        self.histograms = {name: scan_stage_duration.labels(name) for name in SCAN_STAGES}
+
+    def timings(self) -> ScanTimings:
+        return ScanTimings(self.histograms)
+
+    async def run(
+        self,
+        user_id: str,
+        scan_type: str,
+        acquire: Callable[[], Awaitable[Dict]],
+        timings: ScanTimings
+    ) -> Dict:
+        """
+        Run a scan up to and including persistence.
+
+        Args:
+            user_id: User scanning
+            scan_type: ingredients, barcode or image
+            acquire: Returns the source dict (see build_scan_doc); may raise
+                HTTPException
+            timings: Stage timings of this request
+
+        Returns:
+            The stored scan document
+        """
+        try:
+            with timings.stage("acquire"):
+                source = await acquire()
+
+            with timings.stage("profile"):
+                hair_profile = await scoring_service.get_hair_profile(user_id)
+
+            if not hair_profile:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=MISSING_PROFILE_ERROR["message"]
+                )
+
+            with timings.stage("score"):
+                result = scoring_service.score_with_profile(
+                    source["ingredients_text"], hair_profile, source.get("precomputed_scores")
+                )
+
+            if "error" in result:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=result["message"]
+                )
+
+            with timings.stage("persist"):
+                scan_doc = build_scan_doc(user_id, scan_type, source, result)
+                await self._persist(scan_doc)
+        except HTTPException as e:
+            # Failed scans still say where their time went
+            e.headers = {**(e.headers or {}), "Server-Timing": timings.server_timing()}
+            raise
+
+        logger.info(f"{scan_type.capitalize()} scan created: {scan_doc['scan_id']} by user {user_id}")
+        return scan_doc
+
+    @staticmethod
+    async def _persist(scan_doc: Dict):
+        db = get_database()
+
+        await db.scans.insert_one(scan_doc)
+        await scan_stats_service.record_scan(scan_doc["user_id"], scan_doc["verdict"])
+
+        # Increment product scan count
+        if scan_doc["product_id"]:
+            await db.products.update_one(
+                {"product_id": scan_doc["product_id"]},
+                {"$inc": {"scan_count": 1}}
+            )
+
+    def respond(self, scan_doc: Dict, timings: ScanTimings) -> Response:
+        """201 response for a new scan with its Server-Timing header"""
+        with timings.stage("respond"):
+            response = scan_response(scan_doc, status.HTTP_201_CREATED)
+        response.headers["Server-Timing"] = timings.server_timing()
+        return response
+
+    async def scan(self, user_id: str, scan_type: str, acquire: Callable[[], Awaitable[Dict]]) -> Response:
+        """Run the whole pipeline and return the response"""
+        timings = self.timings()
+        scan_doc = await self.run(user_id, scan_type, acquire, timings)
+        return self.respond(scan_doc, timings)
+
+    def stats(self) -> Dict:
+        return {name: histogram.stats() for name, histogram in self.histograms.items()}
+
+scan_pipeline = ScanPipeline()
@@ -1,26 +1,75 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from config.db import get_database
+from config.env import settings
 from middleware.auth import get_current_user
+from middleware.body_limit import max_body_size
+from middleware.rate_limit import rate_limit
 from .models import (
     ScanByIngredients, 
     ScanByBarcode, 
+    ScanByBarcodeBatch,
     ScanByImage, 
     ScanResult,
+    ScanSummary,
+    ScanJob,
+    BarcodeBatchResponse,
     ScanHistoryResponse
 )
+from .serialization import (
+    SCAN_RESULT_PROJECTION,
+    scan_content,
+    scan_response,
+    scan_list_response,
+    summary_list_response,
+    barcode_batch_response
+)
+from .pipeline import scan_pipeline, build_scan_doc
+from engine.segmentation import segment_ingredient_text
 from services.scoring_service import scoring_service
 from services.barcode_service import barcode_service
-from services.ocr_service import ocr_service
-import uuid
+from services.ocr_service import ocr_service, OCRBusy, OCRTimeout
+from services.image_upload import read_image_upload, UploadTooLarge, InvalidImage
+from services.scan_stats_service import scan_stats_service
+from services.scan_jobs import scan_job_queue, ScanJobsFull, FINAL_STATUSES
+from services.export_service import export_service, NDJSON_MEDIA_TYPE
+import asyncio
+import time
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional
+from pymongo import UpdateOne
 import logging
 import base64
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/scans", tags=["Scans"])
 
+def _barcode_source(barcode: str, product: dict) -> dict:
+    """Scan source for a product found by barcode"""
+    return {
+        "product_name": product["name"],
+        "product_brand": product.get("brand"),
+        "product_category": product["category"],
+        "product_id": product.get("product_id"),
+        "barcode": barcode,
+        "ingredients_text": product["ingredients_text"],
+        "precomputed_scores": product.get("precomputed_scores")
+    }
+
+# Fields needed to render a history row - everything else stays in Mongo
+SCAN_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "scan_id": 1,
+    "scan_type": 1,
+    "product_name": 1,
+    "product_brand": 1,
+    "verdict": 1,
+    "overall_score": 1,
+    "created_at": 1
+}
+
 @router.post("/ingredients", response_model=ScanResult, status_code=status.HTTP_201_CREATED)
+@rate_limit(bucket="scan")
 async def scan_by_ingredients(
     scan_data: ScanByIngredients,
     current_user: dict = Depends(get_current_user)
@@ -29,64 +78,13 @@ async def scan_by_ingredients(
     Scan product by manually pasting ingredient list.
     This is the primary scan method.
     """
-    db = get_database()
-    
-    # Score the ingredients
-    result = await scoring_service.score_ingredients(
-        scan_data.ingredients_text,
-        current_user["user_id"]
-    )
+    async def acquire():
+        return scan_data.model_dump()
     
-    # Check for errors
-    if "error" in result:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result["message"]
-        )
-    
-    # Create scan record
-    scan_id = str(uuid.uuid4())
-    
-    scan_doc = {
-        "scan_id": scan_id,
-        "user_id": current_user["user_id"],
-        "scan_type": "ingredients",
-        
-        # Product info
-        "product_name": scan_data.product_name,
-        "product_brand": scan_data.product_brand,
-        "product_category": scan_data.product_category,
-        "product_id": None,
-        "ingredients_text": scan_data.ingredients_text,
-        
-        # Scoring results
-        "verdict": result["verdict"],
-        "overall_score": result["overall_score"],
-        "moisture_score": result["moisture_score"],
-        "buildup_risk": result["buildup_risk"],
-        "scalp_score": result["scalp_score"],
-        "water_based": result["water_based"],
-        "heavy_oils": result["heavy_oils"],
-        "protein_heavy": result["protein_heavy"],
-        "explanation": result["explanation"],
-        
-        # Metadata
-        "matched_ingredients_count": result["matched_ingredients_count"],
-        "total_ingredients_count": result["total_ingredients_count"],
-        
-        # Hair profile used
-        "hair_profile": result["hair_profile"],
-        
-        # Timestamps
-        "created_at": datetime.utcnow()
-    }
-    
-    await db.scans.insert_one(scan_doc)
-    logger.info(f"Scan created: {scan_id} by user {current_user['user_id']}")
-    
-    return ScanResult(**scan_doc)
+    return await scan_pipeline.scan(current_user["user_id"], "ingredients", acquire)
 
 @router.post("/barcode", response_model=ScanResult, status_code=status.HTTP_201_CREATED)
+@rate_limit(bucket="scan")
 async def scan_by_barcode(
     scan_data: ScanByBarcode,
     current_user: dict = Depends(get_current_user)
@@ -95,81 +93,138 @@ async def scan_by_barcode(
     Scan product by barcode.
     Looks up product in database first, then scores ingredients.
     """
+    async def acquire():
+        product = await barcode_service.lookup_product(scan_data.barcode)
+        
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Product with barcode '{scan_data.barcode}' not found. Please scan by ingredients instead."
+            )
+        
+        return _barcode_source(scan_data.barcode, product)
+    
+    return await scan_pipeline.scan(current_user["user_id"], "barcode", acquire)
+
+@router.post("/barcode/batch", response_model=BarcodeBatchResponse, status_code=status.HTTP_201_CREATED)
+@rate_limit(cost=10, bucket="scan")
+async def scan_by_barcode_batch(
+    scan_data: ScanByBarcodeBatch,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Scan several barcodes at once (shelf scanning).
+    Products are resolved with one query, served from their precomputed
+    results where possible (the rest are scored in one engine batch) and
+    saved with one insert. Repeated barcodes are scanned once.
+    """
     db = get_database()
+    barcodes = list(dict.fromkeys(scan_data.barcodes))
     
-    # Lookup product by barcode
-    product = await barcode_service.lookup_product(scan_data.barcode)
+    products = await barcode_service.lookup_products(barcodes)
+    found_barcodes = [barcode for barcode in barcodes if products.get(barcode)]
     
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Product with barcode '{scan_data.barcode}' not found. Please scan by ingredients instead."
-        )
+    scans_by_barcode: Dict[str, dict] = {}
     
-    # Score the product
-    result = await scoring_service.score_ingredients(
-        product["ingredients_text"],
-        current_user["user_id"]
-    )
-    
-    if "error" in result:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result["message"]
+    if found_barcodes:
+        batch = await scoring_service.score_ingredients_batch(
+            [products[barcode]["ingredients_text"] for barcode in found_barcodes],
+            current_user["user_id"],
+            [products[barcode].get("precomputed_scores") for barcode in found_barcodes]
         )
-    
-    # Create scan record
-    scan_id = str(uuid.uuid4())
-    
-    scan_doc = {
-        "scan_id": scan_id,
-        "user_id": current_user["user_id"],
-        "scan_type": "barcode",
         
-        # Product info from barcode lookup
-        "product_name": product["name"],
-        "product_brand": product.get("brand"),
-        "product_category": product["category"],
-        "product_id": product.get("product_id"),
-        "barcode": scan_data.barcode,
-        "ingredients_text": product["ingredients_text"],
-        
-        # Scoring results
-        "verdict": result["verdict"],
-        "overall_score": result["overall_score"],
-        "moisture_score": result["moisture_score"],
-        "buildup_risk": result["buildup_risk"],
-        "scalp_score": result["scalp_score"],
-        "water_based": result["water_based"],
-        "heavy_oils": result["heavy_oils"],
-        "protein_heavy": result["protein_heavy"],
-        "explanation": result["explanation"],
+        if "error" in batch:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=batch["message"]
+            )
         
-        # Metadata
-        "matched_ingredients_count": result["matched_ingredients_count"],
-        "total_ingredients_count": result["total_ingredients_count"],
+        for barcode, result in zip(found_barcodes, batch["results"]):
+            scans_by_barcode[barcode] = build_scan_doc(
+                current_user["user_id"], "barcode", _barcode_source(barcode, products[barcode]), result
+            )
         
-        # Hair profile used
-        "hair_profile": result["hair_profile"],
+        scan_docs = list(scans_by_barcode.values())
+        await db.scans.insert_many(scan_docs, ordered=False)
+        await scan_stats_service.record_scans(
+            current_user["user_id"], [doc["verdict"] for doc in scan_docs]
+        )
         
-        # Timestamps
-        "created_at": datetime.utcnow()
-    }
+        # Increment product scan counts
+        product_ids = [doc["product_id"] for doc in scan_docs if doc["product_id"]]
+        if product_ids:
+            await db.products.bulk_write(
+                [UpdateOne({"product_id": pid}, {"$inc": {"scan_count": 1}}) for pid in product_ids],
+                ordered=False
+            )
+    
+    logger.info(
+        f"Batch barcode scan by user {current_user['user_id']}: "
+        f"{len(scans_by_barcode)}/{len(barcodes)} found"
+    )
     
-    await db.scans.insert_one(scan_doc)
+    return barcode_batch_response(barcodes, scans_by_barcode)
+
+async def _read_image(file: UploadFile) -> bytes:
+    """Validate an uploaded label image and return its bytes"""
+    # Validate file type
+    if not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be an image"
+        )
     
-    # Increment product scan count
-    if product.get("product_id"):
-        await db.products.update_one(
-            {"product_id": product["product_id"]},
-            {"$inc": {"scan_count": 1}}
+    # Check size and image header before anything is decoded
+    try:
+        return await read_image_upload(file, settings.OCR_MAX_UPLOAD_BYTES, settings.OCR_MAX_PIXELS)
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except InvalidImage as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+async def _image_source(image_data: bytes) -> Dict:
+    """OCR an uploaded label into a scan source"""
+    # Extract ingredients using OCR
+    try:
+        ingredients_text = await ocr_service.extract_ingredients_from_image(image_data)
+    except OCRBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="OCR is busy. Please try again shortly.",
+            headers={"Retry-After": "5"}
+        )
+    except OCRTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="OCR timed out. Try a closer, sharper photo of the ingredient list."
         )
     
-    logger.info(f"Barcode scan created: {scan_id}")
+    # Keep only the ingredient block of the label (drops marketing copy, directions, warnings)
+    if ingredients_text:
+        ingredients_text = segment_ingredient_text(ingredients_text)
     
-    return ScanResult(**scan_doc)
+    if not ingredients_text:
+        detail = (
+            "Could not read any text from the image. Please retake the photo or use manual ingredient entry instead."
+            if ocr_service.available else
+            "Could not extract ingredients from image. OCR service not configured. Please use manual ingredient entry instead."
+        )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
+    
+    return {"ingredients_text": ingredients_text}
 
 @router.post("/image", response_model=ScanResult, status_code=status.HTTP_201_CREATED)
+@rate_limit(cost=10, bucket="scan")
+@max_body_size(settings.OCR_MAX_UPLOAD_BYTES + 64 * 1024)  # room for multipart framing
 async def scan_by_image(
     file: UploadFile = File(..., description="Image of ingredient label"),
     current_user: dict = Depends(get_current_user)
@@ -178,80 +233,102 @@ async def scan_by_image(
     Scan product by uploading ingredient label image.
     Uses OCR to extract ingredient text.
     """
-    # Validate file type
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File must be an image"
-        )
+    async def acquire():
+        return await _image_source(await _read_image(file))
     
-    # Read image data
-    image_data = await file.read()
+    return await scan_pipeline.scan(current_user["user_id"], "image", acquire)
+
+@router.post("/image/jobs", response_model=ScanJob, status_code=status.HTTP_202_ACCEPTED)
+@rate_limit(cost=10, bucket="scan")
+@max_body_size(settings.OCR_MAX_UPLOAD_BYTES + 64 * 1024)
+async def submit_image_scan_job(
+    file: UploadFile = File(..., description="Image of ingredient label"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Queue an image scan and return immediately.
+    Poll GET /scans/jobs/{job_id} or stream GET /scans/jobs/{job_id}/events
+    for the result.
+    """
+    image_data = await _read_image(file)
+    user_id = current_user["user_id"]
     
-    # Extract ingredients using OCR
-    ingredients_text = await ocr_service.extract_ingredients_from_image(image_data)
+    async def run():
+        scan_doc = await scan_pipeline.run(user_id, "image", lambda: _image_source(image_data), scan_pipeline.timings())
+        return scan_content(scan_doc)
     
-    if not ingredients_text:
+    try:
+        job = await scan_job_queue.submit(user_id, "image", run)
+    except ScanJobsFull as e:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Could not extract ingredients from image. OCR service not configured. Please use manual ingredient entry instead."
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "5"}
         )
     
-    # Score the extracted ingredients
-    db = get_database()
-    
-    result = await scoring_service.score_ingredients(
-        ingredients_text,
-        current_user["user_id"]
-    )
-    
-    if "error" in result:
+    return ScanJob(**job)
+
+async def _get_job(job_id: str, user_id: str) -> Dict:
+    job = await scan_job_queue.get(job_id, user_id)
+    if not job:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result["message"]
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan job not found"
         )
-    
-    # Create scan record
-    scan_id = str(uuid.uuid4())
-    
-    scan_doc = {
-        "scan_id": scan_id,
-        "user_id": current_user["user_id"],
-        "scan_type": "image",
-        
-        # Product info
-        "product_name": None,
-        "product_brand": None,
-        "product_category": None,
-        "product_id": None,
-        "ingredients_text": ingredients_text,
-        
-        # Scoring results
-        "verdict": result["verdict"],
-        "overall_score": result["overall_score"],
-        "moisture_score": result["moisture_score"],
-        "buildup_risk": result["buildup_risk"],
-        "scalp_score": result["scalp_score"],
-        "water_based": result["water_based"],
-        "heavy_oils": result["heavy_oils"],
-        "protein_heavy": result["protein_heavy"],
-        "explanation": result["explanation"],
+    return job
+
+@router.get("/jobs/{job_id}", response_model=ScanJob)
+async def get_scan_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Current state of a background scan job"""
+    job = await _get_job(job_id, current_user["user_id"])
+    return ScanJob(**job)
+
+async def _job_events(job_id: str, user_id: str) -> AsyncIterator[str]:
+    """Server-Sent Events: one `status` event per change, ending at a final status"""
+    deadline = time.monotonic() + settings.SCAN_JOB_EVENTS_TIMEOUT
+    last_status = None
+    
+    while True:
+        # Taken before reading so a change between the read and the wait is not missed
+        changed = scan_job_queue.watch(job_id)
+        job = await scan_job_queue.get(job_id, user_id)
+        if job is None:
+            yield "event: error\ndata: {\"detail\": \"Scan job not found\"}\n\n"
+            return
         
-        # Metadata
-        "matched_ingredients_count": result["matched_ingredients_count"],
-        "total_ingredients_count": result["total_ingredients_count"],
+        if job["status"] != last_status:
+            last_status = job["status"]
+            payload = ScanJob(**job).model_dump_json()
+            yield f"event: status\ndata: {payload}\n\n"
         
-        # Hair profile used
-        "hair_profile": result["hair_profile"],
+        if last_status in FINAL_STATUSES or time.monotonic() >= deadline:
+            return
         
-        # Timestamps
-        "created_at": datetime.utcnow()
-    }
-    
-    await db.scans.insert_one(scan_doc)
-    logger.info(f"Image scan created: {scan_id}")
+        if changed is None:
+            # Job runs in another API process; fall back to polling
+            await asyncio.sleep(1.0)
+            continue
+        try:
+            await asyncio.wait_for(changed.wait(), timeout=15.0)
+        except asyncio.TimeoutError:
+            yield ": keepalive\n\n"
+
+@router.get("/jobs/{job_id}/events")
+async def stream_scan_job_events(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream status changes of a background scan job as Server-Sent Events"""
+    await _get_job(job_id, current_user["user_id"])
     
-    return ScanResult(**scan_doc)
+    return StreamingResponse(
+        _job_events(job_id, current_user["user_id"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/history", response_model=List[ScanResult])
 async def get_scan_history(
@@ -266,12 +343,59 @@ async def get_scan_history(
     db = get_database()
     
     cursor = db.scans.find(
-        {"user_id": current_user["user_id"]}
+        {"user_id": current_user["user_id"]},
+        SCAN_RESULT_PROJECTION
+    ).sort("created_at", -1).skip(skip).limit(limit)
+    
+    scans = await cursor.to_list(length=limit)
+    
+    return scan_list_response(scans)
+
+@router.get("/history/summary", response_model=List[ScanSummary])
+async def get_scan_history_summary(
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(20, ge=1, le=100),
+    skip: int = Query(0, ge=0)
+):
+    """
+    Get user's scan history as lightweight summaries.
+    Only the fields shown in history listings are loaded;
+    use GET /scans/{scan_id} for the full scan.
+    """
+    db = get_database()
+    
+    cursor = db.scans.find(
+        {"user_id": current_user["user_id"]},
+        SCAN_SUMMARY_PROJECTION
     ).sort("created_at", -1).skip(skip).limit(limit)
     
     scans = await cursor.to_list(length=limit)
     
-    return [ScanResult(**scan) for scan in scans]
+    return summary_list_response(scans)
+
+@router.get("/export")
+@rate_limit(cost=10, bucket="bulk")
+async def export_scans(
+    created_from: Optional[datetime] = Query(None, description="Inclusive lower bound on created_at"),
+    created_to: Optional[datetime] = Query(None, description="Exclusive upper bound on created_at"),
+    after: Optional[str] = Query(None, description="Resume after this scan_id"),
+    batch_size: int = Query(1000, ge=100, le=10000),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream the user's full scan history as NDJSON, ordered by scan_id.
+    To resume an interrupted export, pass the last scan_id received as `after`.
+    """
+    return StreamingResponse(
+        export_service.export_scans(
+            current_user["user_id"],
+            created_from=created_from,
+            created_to=created_to,
+            after=after,
+            batch_size=batch_size
+        ),
+        media_type=NDJSON_MEDIA_TYPE
+    )
 
 @router.get("/{scan_id}", response_model=ScanResult)
 async def get_scan(
@@ -287,7 +411,7 @@ async def get_scan(
     scan = await db.scans.find_one({
         "scan_id": scan_id,
         "user_id": current_user["user_id"]
-    })
+    }, SCAN_RESULT_PROJECTION)
     
     if not scan:
         raise HTTPException(
@@ -295,7 +419,7 @@ async def get_scan(
             detail="Scan not found"
         )
     
-    return ScanResult(**scan)
+    return scan_response(scan)
 
 @router.delete("/{scan_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_scan(
@@ -305,16 +429,18 @@ async def delete_scan(
     """Delete a scan from history"""
     db = get_database()
     
-    result = await db.scans.delete_one({
-        "scan_id": scan_id,
-        "user_id": current_user["user_id"]
-    })
+    deleted = await db.scans.find_one_and_delete(
+        {"scan_id": scan_id, "user_id": current_user["user_id"]},
+        projection={"verdict": 1}
+    )
     
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Scan not found"
         )
     
+    await scan_stats_service.record_scan(current_user["user_id"], deleted["verdict"], delta=-1)
+    
     logger.info(f"Scan deleted: {scan_id}")
     return None
\ No newline at end of file
@@ -0,0 +1,86 @@
+from fastapi import status
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import TypeAdapter
+from config.env import settings
+from .models import BarcodeBatchResponse, ScanResult, ScanSummary
+from typing import Dict, Iterable, List
+
+# Scan documents are only ever written by this module's routes, so their
+# shape is already what ScanResult describes. Responses copy the declared
+# fields and go straight to orjson instead of being rebuilt as models and
+# validated a second time by FastAPI's response_model handling.
+SCAN_RESULT_FIELDS = tuple(ScanResult.model_fields)
+SCAN_SUMMARY_FIELDS = tuple(ScanSummary.model_fields)
+
+# Load only what the response carries (no _id, barcode, ...)
+SCAN_RESULT_PROJECTION = {"_id": 0, **{field: 1 for field in SCAN_RESULT_FIELDS}}
+
+_scan_list = TypeAdapter(List[ScanResult])
+_summary_list = TypeAdapter(List[ScanSummary])
+
+def _pick(doc: Dict, fields: tuple) -> Dict:
+    return {field: doc.get(field) for field in fields}
+
+def scan_content(doc: Dict) -> Dict:
+    """JSON-ready ScanResult body for a scan document"""
+    return _pick(doc, SCAN_RESULT_FIELDS)
+
+def _validated(adapter: TypeAdapter, docs: List[Dict], status_code: int) -> Response:
+    # One validation pass, serialized by pydantic-core
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(docs)),
+        media_type="application/json",
+        status_code=status_code
+    )
+
+def scan_response(doc: Dict, status_code: int = status.HTTP_200_OK) -> Response:
+    """
+    Response for a single scan document.
+
+    Args:
+        doc: Scan document as stored in (or read from) the scans collection
+        status_code: HTTP status of the response
+
+    Returns:
+        orjson response, or a once-validated one with VALIDATE_SCAN_RESPONSES
+    """
+    if settings.VALIDATE_SCAN_RESPONSES:
+        model = ScanResult.model_validate(doc)
+        return Response(content=model.model_dump_json(), media_type="application/json", status_code=status_code)
+    return ORJSONResponse(scan_content(doc), status_code=status_code)
+
+def scan_list_response(docs: Iterable[Dict]) -> Response:
+    """Response for a list of scan documents (history)"""
+    docs = list(docs)
+    if settings.VALIDATE_SCAN_RESPONSES:
+        return _validated(_scan_list, docs, status.HTTP_200_OK)
+    return ORJSONResponse([scan_content(doc) for doc in docs])
+
+def summary_list_response(docs: Iterable[Dict]) -> Response:
+    """Response for a list of projected scan summaries"""
+    docs = list(docs)
+    if settings.VALIDATE_SCAN_RESPONSES:
+        return _validated(_summary_list, docs, status.HTTP_200_OK)
+    return ORJSONResponse([_pick(doc, SCAN_SUMMARY_FIELDS) for doc in docs])
+
+def barcode_batch_response(barcodes: List[str], scans_by_barcode: Dict[str, Dict]) -> Response:
+    """BarcodeBatchResponse for the requested barcodes and the scans created for them"""
+    content = {
+        "results": [
+            {
+                "barcode": barcode,
+                "found": barcode in scans_by_barcode,
+                "scan": scan_content(scans_by_barcode[barcode]) if barcode in scans_by_barcode else None
+            }
+            for barcode in barcodes
+        ],
+        "found": len(scans_by_barcode),
+        "not_found": len(barcodes) - len(scans_by_barcode)
+    }
+    if settings.VALIDATE_SCAN_RESPONSES:
+        return Response(
+            content=BarcodeBatchResponse.model_validate(content).model_dump_json(),
+            media_type="application/json",
+            status_code=status.HTTP_201_CREATED
+        )
+    return ORJSONResponse(content, status_code=status.HTTP_201_CREATED)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Optional, Dict
 from datetime import datetime
 
 class UserUpdate(BaseModel):
@@ -11,4 +11,5 @@ class UserProfile(BaseModel):
     email: str
     full_name: str
     created_at: datetime
-    total_scans: int = 0
\ No newline at end of file
+    total_scans: int = 0
+    scans_by_verdict: Dict[str, int] = {}
\ No newline at end of file
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from config.db import get_database
 from middleware.auth import get_current_user
+from services.scan_stats_service import scan_stats_service
 from .models import UserUpdate, UserProfile
 from datetime import datetime
 import logging
@@ -11,17 +12,16 @@ router = APIRouter(prefix="/users", tags=["Users"])
 @router.get("/profile", response_model=UserProfile)
 async def get_user_profile(current_user: dict = Depends(get_current_user)):
     """Get user profile with statistics"""
-    db = get_database()
-    
-    # Count total scans
-    total_scans = await db.scans.count_documents({"user_id": current_user["user_id"]})
+    # Counters live on the user document, so no extra query is needed
+    scan_stats = await scan_stats_service.get_scan_stats(current_user)
     
     return UserProfile(
         user_id=current_user["user_id"],
         email=current_user["email"],
         full_name=current_user["full_name"],
         created_at=current_user["created_at"],
-        total_scans=total_scans
+        total_scans=scan_stats["total"],
+        scans_by_verdict=scan_stats["by_verdict"]
     )
 
 @router.put("/profile", response_model=UserProfile)
@@ -58,7 +58,7 @@ async def update_user_profile(
     
     # Get updated user
     updated_user = await db.users.find_one({"user_id": current_user["user_id"]})
-    total_scans = await db.scans.count_documents({"user_id": current_user["user_id"]})
+    scan_stats = await scan_stats_service.get_scan_stats(updated_user)
     
     logger.info(f"User profile updated: {current_user['user_id']}")
     
@@ -67,5 +67,6 @@ async def update_user_profile(
         email=updated_user["email"],
         full_name=updated_user["full_name"],
         created_at=updated_user["created_at"],
-        total_scans=total_scans
+        total_scans=scan_stats["total"],
+        scans_by_verdict=scan_stats["by_verdict"]
     )
\ No newline at end of file
@@ -1,9 +1,13 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from config.env import settings
 from config.db import connect_to_mongo, close_mongo_connection
-from middleware.rate_limit import rate_limiter
+from middleware.body_limit import BodySizeLimitMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.profiler import ProfilerMiddleware, RequestProfiler
+from middleware.rate_limit import rate_limiter, rate_limit
+from services.metrics import event_loop_monitor, observe_engine_stage, render_metrics, PROMETHEUS_CONTENT_TYPE
 import logging
 import sys
 
@@ -26,6 +30,18 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Sampled / on-demand request profiles (innermost, in the task that runs the route)
+if settings.PROFILE_SAMPLE_RATE > 0 or settings.PROFILE_TOKEN:
+    app.add_middleware(
+        ProfilerMiddleware,
+        profiler=RequestProfiler(settings.PROFILE_DIR, interval=settings.PROFILE_INTERVAL_MS / 1000),
+        sample_rate=settings.PROFILE_SAMPLE_RATE,
+        token=settings.PROFILE_TOKEN
+    )
+
+# Per-route request body caps (inside CORS so 413s carry CORS headers)
+app.add_middleware(BodySizeLimitMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -40,6 +56,9 @@ app.add_middleware(
 async def startup_event():
     """Connect to MongoDB on startup"""
     logger.info("Starting up Hair Scanner API...")
+    # Fail fast if a configured rate limit budget is below a route's cost
+    rate_limiter.validate_routes(app.routes)
+    
     await connect_to_mongo()
     
     # Load ingredients into database
@@ -50,6 +69,16 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"Error loading ingredients: {e}")
     
+    await rate_limiter.start()
+    
+    from services.scan_jobs import scan_job_queue
+    await scan_job_queue.start()
+    
+    if settings.METRICS_ENABLED:
+        from engine.engine import engine
+        engine.timing_observer = observe_engine_stage
+        await event_loop_monitor.start()
+    
     logger.info("API ready to accept requests")
 
 # Shutdown event
@@ -57,21 +86,37 @@ async def startup_event():
 async def shutdown_event():
     """Close MongoDB connection on shutdown"""
     logger.info("Shutting down Hair Scanner API...")
+    await event_loop_monitor.stop()
+    from services.external_barcode import external_barcode_service
+    await external_barcode_service.close()
+    from services.scan_jobs import scan_job_queue
+    await scan_job_queue.stop()
+    from services.password_service import password_service
+    password_service.shutdown()
+    from services.ocr_service import ocr_service
+    ocr_service.close()
+    await rate_limiter.stop()
     await close_mongo_connection()
 
 # Rate limiting middleware
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
-    """Apply rate limiting to all requests"""
+    """Charge each request to its route's rate-limit bucket before it runs"""
     try:
         await rate_limiter.check_rate_limit(request)
-        response = await call_next(request)
-        return response
-    except Exception as e:
+    except HTTPException as e:
         return JSONResponse(
-            status_code=429,
-            content={"detail": str(e)}
+            status_code=e.status_code,
+            content={"detail": e.detail},
+            headers=e.headers
         )
+    
+    # Errors from the route reach the exception handlers instead of becoming 429s
+    return await call_next(request)
+
+# Request latency and status per route (outermost, so it sees 429s and 413s too)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Import and register routes
 from modules.auth.routes import router as auth_router
@@ -90,6 +135,7 @@ app.include_router(scans_router, prefix=settings.API_V1_PREFIX)
 
 # Health check endpoint
 @app.get("/health")
+@rate_limit(exempt=True)
 async def health_check():
     """Health check endpoint"""
     return {
@@ -98,8 +144,18 @@ async def health_check():
         "version": "1.0.0"
     }
 
+# Prometheus metrics
+@app.get("/metrics", include_in_schema=False)
+@rate_limit(exempt=True)
+async def metrics():
+    """Metrics in Prometheus text format"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(content=render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 # Root endpoint
 @app.get("/")
+@rate_limit(exempt=True)
 async def root():
     """Root endpoint with API information"""
     return {
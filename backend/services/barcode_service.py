@@ -1,10 +1,27 @@
 from config.db import get_database
-from typing import Optional, Dict
+from services.cache import LRUCache, SingleFlight
+from services.external_barcode import external_barcode_service
+from services.product_search import build_search_keys
+from pymongo import ReturnDocument
+from typing import Optional, Dict, List
+import asyncio
+from datetime import datetime
 import logging
-import requests
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# Shoppers rescan the same shelf items, and most unknown barcodes stay unknown.
+# Entries expire so changes made by other workers are picked up.
+PRODUCT_CACHE_TTL = 600
+NOT_FOUND_CACHE_TTL = 300
+
+product_cache = LRUCache(maxsize=10000, ttl=PRODUCT_CACHE_TTL, name="barcode_products")
+not_found_cache = LRUCache(maxsize=50000, ttl=NOT_FOUND_CACHE_TTL, name="barcode_not_found")
+
+# Concurrent scans of the same unknown barcode share one upstream call and write
+external_lookups = SingleFlight()
+
 class BarcodeService:
     """Service for barcode lookup"""
     
@@ -20,6 +37,13 @@ class BarcodeService:
         Returns:
             Product data or None
         """
+        cached = product_cache.get(barcode)
+        if cached:
+            return dict(cached)
+        
+        if not_found_cache.get(barcode):
+            return None
+        
         db = get_database()
         
         # Check local database first
@@ -27,39 +51,128 @@ class BarcodeService:
         
         if product:
             logger.info(f"Product found in local database: {barcode}")
-            return {
-                "source": "local",
-                "product_id": product["product_id"],
-                "name": product["name"],
-                "brand": product.get("brand"),
-                "category": product["category"],
-                "ingredients_text": product["ingredients_text"],
-                "image_url": product.get("image_url")
-            }
-        
-        # TODO: Integrate with external barcode API
-        # For now, return None for external lookups
+            result = BarcodeService._to_result(product, "local")
+            product_cache.set(barcode, result)
+            return dict(result)
+        
         logger.info(f"Product not found in local database: {barcode}")
         
-        # Placeholder for future external API integration
-        # external_result = await BarcodeService._lookup_external(barcode)
-        # if external_result:
-        #     return external_result
+        external_result = await external_lookups.do(
+            barcode, lambda: BarcodeService._lookup_external(barcode)
+        )
+        if external_result:
+            product_cache.set(barcode, external_result)
+            return dict(external_result)
         
+        not_found_cache.set(barcode, True)
         return None
     
     @staticmethod
-    async def _lookup_external(barcode: str) -> Optional[Dict]:
+    async def lookup_products(barcodes: List[str]) -> Dict[str, Optional[Dict]]:
         """
-        Look up product from external barcode API.
-        Placeholder for future implementation.
+        Look up several barcodes at once.
+        Cache misses are resolved with a single $in query; anything still
+        unknown falls back to the external API concurrently.
         
-        Options:
-        - Open Food Facts API
-        - UPC Database API
-        - Barcode Lookup API
+        Args:
+            barcodes: Product barcodes/UPCs
+        
+        Returns:
+            Mapping of barcode to product data (None if not found)
         """
-        # This will be implemented when user provides API key
-        pass
+        results: Dict[str, Optional[Dict]] = {}
+        pending = []
+        
+        for barcode in dict.fromkeys(barcodes):
+            cached = product_cache.get(barcode)
+            if cached:
+                results[barcode] = dict(cached)
+            elif not_found_cache.get(barcode):
+                results[barcode] = None
+            else:
+                pending.append(barcode)
+        
+        if pending:
+            db = get_database()
+            cursor = db.products.find({"barcode": {"$in": pending}})
+            async for product in cursor:
+                result = BarcodeService._to_result(product, "local")
+                product_cache.set(product["barcode"], result)
+                results[product["barcode"]] = dict(result)
+        
+        missing = [barcode for barcode in pending if barcode not in results]
+        if missing:
+            external_results = await asyncio.gather(*[
+                external_lookups.do(barcode, lambda barcode=barcode: BarcodeService._lookup_external(barcode))
+                for barcode in missing
+            ])
+            for barcode, external_result in zip(missing, external_results):
+                if external_result:
+                    product_cache.set(barcode, external_result)
+                    results[barcode] = dict(external_result)
+                else:
+                    not_found_cache.set(barcode, True)
+                    results[barcode] = None
+        
+        return results
+    
+    @staticmethod
+    def _to_result(product: Dict, source: str) -> Dict:
+        result = {
+            "source": source,
+            "product_id": product["product_id"],
+            "name": product["name"],
+            "brand": product.get("brand"),
+            "category": product["category"],
+            "ingredients_text": product["ingredients_text"],
+            "image_url": product.get("image_url")
+        }
+        if product.get("precomputed_scores"):
+            result["precomputed_scores"] = product["precomputed_scores"]
+        return result
+    
+    @staticmethod
+    def invalidate(*barcodes: Optional[str]):
+        """
+        Drop cached lookups for barcodes whose product was created,
+        updated or deleted.
+        """
+        for barcode in barcodes:
+            if barcode:
+                product_cache.pop(barcode)
+                not_found_cache.pop(barcode)
+    
+    @staticmethod
+    async def _lookup_external(barcode: str) -> Optional[Dict]:
+        """
+        Look up product from the external barcode API and save it to the
+        products collection, so the next lookup is served locally.
+        """
+        external = await external_barcode_service.lookup(barcode)
+        if not external:
+            return None
+        
+        db = get_database()
+        now = datetime.utcnow()
+        
+        # Upsert on barcode so concurrent workers can't create duplicates
+        product = await db.products.find_one_and_update(
+            {"barcode": barcode},
+            {"$setOnInsert": {
+                **external,
+                "product_id": str(uuid.uuid4()),
+                "search_keys": build_search_keys(external["name"], external.get("brand")),
+                "created_at": now,
+                "updated_at": now,
+                "scan_count": 0,
+                "created_by": None,
+                "source": "external"
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        
+        logger.info(f"Product imported from external API: {barcode}")
+        return BarcodeService._to_result(product, "external")
 
 barcode_service = BarcodeService()
\ No newline at end of file
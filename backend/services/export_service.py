@@ -0,0 +1,109 @@
+from config.db import get_database
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Internal fields that never leave the server
+PRODUCT_EXPORT_PROJECTION = {"_id": 0, "search_keys": 0, "precomputed_scores": 0}
+SCAN_EXPORT_PROJECTION = {"_id": 0}
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _date_range(created_from: Optional[datetime], created_to: Optional[datetime]) -> Optional[Dict]:
+    date_filter = {}
+    if created_from:
+        date_filter["$gte"] = created_from
+    if created_to:
+        date_filter["$lt"] = created_to
+    return date_filter or None
+
+async def stream_ndjson(cursor, batch_size: int, collection: str) -> AsyncIterator[bytes]:
+    """
+    Serialize a Mongo cursor as NDJSON.
+    Lines are flushed once per cursor batch, so memory stays bounded by
+    batch_size documents no matter how large the export is.
+    """
+    exported = 0
+    lines = []
+    try:
+        async for doc in cursor:
+            lines.append(json.dumps(doc, default=_json_default, ensure_ascii=False))
+            if len(lines) >= batch_size:
+                exported += len(lines)
+                yield ("\n".join(lines) + "\n").encode()
+                lines = []
+
+        if lines:
+            exported += len(lines)
+            yield ("\n".join(lines) + "\n").encode()
+    finally:
+        # Runs on client disconnect too, releasing the server-side cursor
+        await cursor.close()
+        logger.info(f"Exported {exported} {collection}")
+
+class ExportService:
+    """Streaming exports ordered by a unique key so they can be resumed"""
+
+    @staticmethod
+    def export_products(
+        category: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        after: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream products ordered by product_id.
+        Pass the last product_id received as `after` to resume.
+        """
+        query = {}
+        if category:
+            query["category"] = category
+        date_filter = _date_range(created_from, created_to)
+        if date_filter:
+            query["created_at"] = date_filter
+        if after:
+            query["product_id"] = {"$gt": after}
+
+        db = get_database()
+        cursor = db.products.find(
+            query, PRODUCT_EXPORT_PROJECTION
+        ).sort("product_id", 1).batch_size(batch_size)
+
+        return stream_ndjson(cursor, batch_size, "products")
+
+    @staticmethod
+    def export_scans(
+        user_id: str,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        after: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream a user's scans ordered by scan_id.
+        Pass the last scan_id received as `after` to resume.
+        """
+        query = {"user_id": user_id}
+        date_filter = _date_range(created_from, created_to)
+        if date_filter:
+            query["created_at"] = date_filter
+        if after:
+            query["scan_id"] = {"$gt": after}
+
+        db = get_database()
+        cursor = db.scans.find(
+            query, SCAN_EXPORT_PROJECTION
+        ).sort("scan_id", 1).batch_size(batch_size)
+
+        return stream_ndjson(cursor, batch_size, "scans")
+
+export_service = ExportService()
@@ -0,0 +1,166 @@
+from config.env import settings
+from typing import Optional, Dict
+import httpx
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(Exception):
+    """Raised when the upstream barcode API is considered unavailable"""
+    pass
+
+class CircuitBreaker:
+    """
+    Minimal circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are rejected for `reset_timeout` seconds. The next call after that
+    is let through as a trial; success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        if self.state == "open":
+            raise CircuitOpenError("External barcode API circuit is open")
+        if self.state == "half-open":
+            # Allow a single trial call; re-open until it reports back
+            self.opened_at = time.monotonic()
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"External barcode API circuit opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+class ExternalBarcodeService:
+    """
+    Async lookup against an Open Food Facts compatible barcode API.
+
+    A single pooled httpx client is shared by all requests and a circuit
+    breaker stops calling the API while it is failing.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.EXTERNAL_BARCODE_FAILURE_THRESHOLD,
+            reset_timeout=settings.EXTERNAL_BARCODE_RESET_TIMEOUT
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return settings.EXTERNAL_BARCODE_ENABLED
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.EXTERNAL_BARCODE_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.EXTERNAL_BARCODE_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.EXTERNAL_BARCODE_MAX_CONNECTIONS
+                ),
+                headers={"User-Agent": f"{settings.PROJECT_NAME} barcode lookup"}
+            )
+        return self._client
+
+    async def close(self):
+        """Close the pooled HTTP client (called on shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def lookup(self, barcode: str) -> Optional[Dict]:
+        """
+        Look up a barcode upstream.
+
+        Returns:
+            Normalized product data, or None if unknown, disabled or unavailable
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            return await self._fetch(barcode)
+        except Exception as e:
+            logger.error(f"External barcode lookup failed for {barcode}: {e}")
+            return None
+
+    async def _fetch(self, barcode: str) -> Optional[Dict]:
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            logger.info(f"Skipping external lookup for {barcode}: circuit open")
+            return None
+
+        url = settings.EXTERNAL_BARCODE_URL.format(barcode=barcode)
+        try:
+            response = await self._get_client().get(url)
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            logger.warning(f"External barcode API request failed: {e}")
+            return None
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            logger.warning(f"External barcode API returned {response.status_code}")
+            return None
+
+        self.breaker.record_success()
+
+        if response.status_code != 200:
+            return None
+
+        try:
+            payload = response.json()
+        except ValueError:
+            logger.warning(f"External barcode API returned invalid JSON for {barcode}")
+            return None
+
+        return self._parse_open_food_facts(barcode, payload)
+
+    @staticmethod
+    def _parse_open_food_facts(barcode: str, payload: Dict) -> Optional[Dict]:
+        """Map an Open Food Facts response to our product fields"""
+        if payload.get("status") != 1:
+            return None
+
+        product = payload.get("product") or {}
+        ingredients_text = (product.get("ingredients_text_en") or product.get("ingredients_text") or "").strip()
+        name = (product.get("product_name") or "").strip()
+
+        # Without ingredients the product can't be scored
+        if not ingredients_text or not name:
+            return None
+
+        categories = [c.strip() for c in (product.get("categories") or "").split(",") if c.strip()]
+        brands = [b.strip() for b in (product.get("brands") or "").split(",") if b.strip()]
+
+        return {
+            "name": name,
+            "brand": brands[0] if brands else None,
+            "barcode": barcode,
+            "category": categories[-1].lower() if categories else "other",
+            "ingredients_text": ingredients_text,
+            "image_url": product.get("image_url")
+        }
+
+external_barcode_service = ExternalBarcodeService()
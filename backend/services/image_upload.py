@@ -0,0 +1,54 @@
+from fastapi import UploadFile
+from PIL import Image, UnidentifiedImageError
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Formats tesseract preprocessing can decode; anything else is rejected up front
+ALLOWED_IMAGE_FORMATS = {"JPEG", "PNG", "WEBP", "BMP", "TIFF", "MPO"}
+
+class UploadTooLarge(Exception):
+    pass
+
+class InvalidImage(Exception):
+    pass
+
+async def read_image_upload(upload: UploadFile, max_bytes: int, max_pixels: int) -> bytes:
+    """
+    Validate an uploaded image and return its bytes.
+
+    The upload is already spooled by the multipart parser (in memory up to
+    1 MB, then on disk). Its size is checked with a seek and its header is
+    parsed straight from the spool, so oversized or malformed files are
+    rejected before anything is decoded or copied into memory.
+
+    Raises:
+        UploadTooLarge: File exceeds max_bytes
+        InvalidImage: Not a supported image, or more than max_pixels
+    """
+    spool = upload.file
+    spool.seek(0, os.SEEK_END)
+    size = spool.tell()
+    spool.seek(0)
+
+    if size > max_bytes:
+        raise UploadTooLarge(f"Image too large (max {max_bytes // (1024 * 1024)} MB)")
+    if size == 0:
+        raise InvalidImage("Empty file")
+
+    # Image.open only reads the header; pixel data is not decoded here
+    try:
+        with Image.open(spool) as image:
+            image_format = image.format
+            width, height = image.size
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise InvalidImage("File is not a readable image")
+
+    if image_format not in ALLOWED_IMAGE_FORMATS:
+        raise InvalidImage(f"Unsupported image format: {image_format}")
+    if width * height > max_pixels:
+        raise InvalidImage(f"Image dimensions too large ({width}x{height})")
+
+    spool.seek(0)
+    return await upload.read()
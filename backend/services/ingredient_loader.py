@@ -51,18 +51,14 @@ async def load_ingredients_to_db():
     return total_loaded
 
 async def get_ingredient_by_name(name: str):
-    """Get ingredient info from database"""
-    db = get_database()
-    return await db.ingredients.find_one({"name": name.lower()})
+    """Get ingredient info from the engine's in-memory index"""
+    from engine.engine import engine
+    return engine.ingredient_index.get(name)
 
 async def search_ingredients(query: str, limit: int = 20):
-    """Search ingredients by name"""
-    db = get_database()
-    cursor = db.ingredients.find(
-        {"name": {"$regex": query.lower(), "$options": "i"}}
-    ).limit(limit)
-    
-    return await cursor.to_list(length=limit)
+    """Autocomplete ingredients from the engine's in-memory index"""
+    from engine.engine import engine
+    return engine.ingredient_index.search(query, limit=limit)
 
 if __name__ == "__main__":
     # For testing
@@ -0,0 +1,96 @@
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+class LatencyTracker:
+    """
+    Rolling window of recent latencies for percentile reporting.
+
+    Keeps the last `window` observations, so percentiles reflect current
+    behaviour rather than the whole process lifetime.
+    """
+
+    def __init__(self, window: int = 1000, name: str = "latency"):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self._samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self._samples.append(seconds)
+
+    def percentiles(self, quantiles: Iterable[float] = (0.5, 0.95, 0.99)) -> Dict[str, float]:
+        """Nearest-rank percentiles in milliseconds"""
+        ordered = sorted(self._samples)
+        result = {}
+        for q in quantiles:
+            label = f"p{int(q * 100)}_ms"
+            if not ordered:
+                result[label] = 0.0
+                continue
+            index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+            result[label] = round(ordered[index] * 1000, 2)
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            **self.percentiles()
+        }
+
+# Upper bounds in seconds, roughly Prometheus' defaults extended for OCR
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram for the process lifetime.
+
+    Unlike LatencyTracker it never forgets and is cheap to aggregate
+    across workers: observe() is a bisect and an increment.
+    """
+
+    def __init__(self, name: str = "latency", buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = tuple(sorted(buckets))
+        # One extra slot for observations above the largest bucket (+Inf)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        self._counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations <= bound) pairs, ending with +Inf"""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self._counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation, in seconds"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, running in self.cumulative():
+            if running >= rank:
+                return bound if bound != float("inf") else self.buckets[-1]
+        return self.buckets[-1]
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_le_ms": round(self.quantile(0.5) * 1000, 2),
+            "p95_le_ms": round(self.quantile(0.95) * 1000, 2),
+            "p99_le_ms": round(self.quantile(0.99) * 1000, 2)
+        }
@@ -0,0 +1,331 @@
+from pymongo import monitoring
+from services.latency import Histogram, DEFAULT_BUCKETS
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Starlette appends "; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# (labels, value) of a scrape-time metric
+Sample = Tuple[Dict[str, str], float]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class HistogramFamily:
+    """
+    Histograms sharing a name, one per label combination.
+
+    The hot path is labels(...).observe(seconds): a dict lookup, a bisect
+    and two additions. Rendering walks the buckets only at scrape time.
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[str, ...], Histogram] = {}
+
+    def labels(self, *values: str) -> Histogram:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = Histogram(name=self.name, buckets=self.buckets)
+        return child
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        for values, histogram in list(self._children.items()):
+            labels = dict(zip(self.label_names, values))
+            for bound, count in histogram.cumulative():
+                yield f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {count}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(histogram.total)}"
+            yield f"{self.name}_count{_format_labels(labels)} {histogram.count}"
+
+class CounterFamily:
+    """Monotonic counters sharing a name, one per label combination"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *values: str, amount: float = 1):
+        self._values[values] = self._values.get(values, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        for values, value in list(self._values.items()):
+            yield f"{self.name}{_format_labels(dict(zip(self.label_names, values)))} {_format_value(value)}"
+
+class MetricsRegistry:
+    """
+    Metrics in Prometheus text format.
+
+    Histograms and counters updated on the hot path are registered once;
+    everything services already track in their stats() is read by
+    collectors only when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._families: List = []
+        # (name, type, help, collect)
+        self._collectors: List[Tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> HistogramFamily:
+        family = HistogramFamily(name, help_text, label_names, buckets)
+        self._families.append(family)
+        return family
+
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> CounterFamily:
+        family = CounterFamily(name, help_text, label_names)
+        self._families.append(family)
+        return family
+
+    def collector(self, name: str, metric_type: str, help_text: str, collect: Callable[[], Iterable[Sample]]):
+        """
+        Register a scrape-time metric.
+
+        Args:
+            name: Metric name
+            metric_type: counter or gauge
+            help_text: HELP line
+            collect: Returns (labels, value) samples
+        """
+        self._collectors.append((name, metric_type, help_text, collect))
+
+    def render(self) -> str:
+        lines = []
+        for family in self._families:
+            lines.extend(family.render())
+        for name, metric_type, help_text, collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception as e:
+                logger.warning(f"Metrics collector {name} failed: {e}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time from request start to the last response byte",
+    ("method", "route")
+)
+http_requests = registry.counter(
+    "http_requests_total",
+    "Requests by route and status code",
+    ("method", "route", "status")
+)
+engine_stage_duration = registry.histogram(
+    "engine_stage_duration_seconds",
+    "IngredientEngine.score_product time by stage (parse, match, rules)",
+    ("stage",),
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+)
+mongo_command_duration = registry.histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command round trip by command and collection",
+    ("command", "collection")
+)
+mongo_command_failures = registry.counter(
+    "mongo_command_failures_total",
+    "MongoDB commands that returned an error",
+    ("command", "collection")
+)
+event_loop_lag = registry.histogram(
+    "event_loop_lag_seconds",
+    "How late a periodic event loop timer fired",
+    (),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+def observe_engine_stage(stage: str, seconds: float):
+    engine_stage_duration.labels(stage).observe(seconds)
+
+# Commands that address a collection; everything else (hello, ping, auth) is ignored
+MONITORED_COMMANDS = {
+    "find", "getMore", "insert", "update", "delete", "aggregate", "count",
+    "distinct", "findAndModify", "createIndexes", "listIndexes", "drop"
+}
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Per-collection command latencies from the driver's command monitoring.
+
+    Motor runs pymongo calls on a thread pool, so callbacks arrive on
+    worker threads; a lock guards the shared state.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # request_id -> (command, collection)
+        self._inflight: Dict[int, Tuple[str, str]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name not in MONITORED_COMMANDS:
+            return
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            # getMore carries the cursor id there and the collection separately
+            target = event.command.get("collection")
+        if isinstance(target, str):
+            with self._lock:
+                self._inflight[event.request_id] = (event.command_name, target)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            key = self._inflight.pop(event.request_id, None)
+            if key is None:
+                return
+            mongo_command_duration.labels(*key).observe(event.duration_micros / 1e6)
+            if failed:
+                mongo_command_failures.inc(*key)
+
+mongo_command_listener = MongoCommandListener()
+
+class EventLoopLagMonitor:
+    """
+    Measure event loop responsiveness.
+
+    Sleeps `interval` seconds in a loop and records how much later than
+    requested it woke up; blocking calls on the loop show up as lag.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(0.0, loop.time() - expected)
+            event_loop_lag.labels().observe(self.last_lag)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+event_loop_monitor = EventLoopLagMonitor()
+
+def _cache_stats() -> List[Dict]:
+    from services.cache import LRUCache
+    from services.ocr_service import ocr_service
+
+    caches = []
+    for cache in list(LRUCache.instances):
+        caches.append({"cache": cache.name, "tier": "memory", "hits": cache.hits, "misses": cache.misses, "entries": len(cache)})
+
+    ocr_cache = ocr_service.cache.stats()
+    caches.append({
+        "cache": ocr_cache["name"], "tier": "memory",
+        "hits": ocr_cache["memory_hits"], "misses": ocr_cache["misses"], "entries": ocr_cache["size"]
+    })
+    # Misses are only counted once, after both tiers were tried
+    caches.append({"cache": ocr_cache["name"], "tier": "mongo", "hits": ocr_cache["persistent_hits"]})
+    return caches
+
+def _cache_metric(field: str) -> Callable[[], Iterator[Sample]]:
+    def collect():
+        for cache in _cache_stats():
+            if field in cache:
+                yield {"cache": cache["cache"], "tier": cache["tier"]}, cache[field]
+    return collect
+
+def _worker_pool_stats() -> Dict[str, Dict]:
+    from services.ocr_service import ocr_service
+    from services.password_service import password_service
+    from services.scan_jobs import scan_job_queue
+
+    return {
+        "ocr": ocr_service.stats(),
+        "password_hash": password_service.stats(),
+        "scan_jobs": scan_job_queue.stats()
+    }
+
+# Counters each pool already keeps, exported as worker_pool_tasks_total{outcome};
+# outcomes are mutually exclusive so they sum to the tasks handled
+POOL_OUTCOMES = {
+    "ocr": ("succeeded", "empty", "failed", "timeouts", "rejected"),
+    "password_hash": ("completed", "rejected"),
+    "scan_jobs": ("completed", "failed", "rejected")
+}
+
+def _pool_field(field: str) -> Callable[[], Iterator[Sample]]:
+    def collect():
+        for pool, stats in _worker_pool_stats().items():
+            if field in stats:
+                yield {"pool": pool}, stats[field]
+    return collect
+
+def _pool_outcomes() -> Iterator[Sample]:
+    for pool, stats in _worker_pool_stats().items():
+        for outcome in POOL_OUTCOMES[pool]:
+            yield {"pool": pool, "outcome": outcome}, stats[outcome]
+
+def _rate_limit_rejections() -> Iterator[Sample]:
+    from middleware.rate_limit import rate_limiter
+
+    for bucket, count in list(rate_limiter.rejections.items()):
+        yield {"bucket": bucket}, count
+
+registry.collector("cache_hits_total", "counter", "Cache lookups answered from the cache", _cache_metric("hits"))
+registry.collector("cache_misses_total", "counter", "Cache lookups that missed", _cache_metric("misses"))
+registry.collector("cache_entries", "gauge", "Entries currently cached", _cache_metric("entries"))
+registry.collector("worker_pool_in_flight", "gauge", "Tasks running in a bounded worker pool", _pool_field("in_flight"))
+registry.collector("worker_pool_queued", "gauge", "Tasks waiting for a bounded worker pool", _pool_field("queued"))
+registry.collector("worker_pool_tasks_total", "counter", "Finished worker pool tasks by outcome", _pool_outcomes)
+registry.collector("worker_pool_submitted_total", "counter", "Tasks accepted by a worker pool that queues them", _pool_field("submitted"))
+registry.collector(
+    "password_rehashes_total", "counter", "Logins that upgraded a hash to the current bcrypt cost (subset of completed)",
+    lambda: [({}, _worker_pool_stats()["password_hash"]["rehashed"])]
+)
+registry.collector("rate_limit_rejections_total", "counter", "Requests rejected with 429 by bucket", _rate_limit_rejections)
+registry.collector(
+    "event_loop_lag_last_seconds", "gauge", "Lag of the most recent event loop timer",
+    lambda: [({}, event_loop_monitor.last_lag)]
+)
+
+def render_metrics() -> str:
+    """Prometheus text exposition of all registered metrics"""
+    return registry.render()
@@ -0,0 +1,189 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from config.db import get_database
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 256
+BAND_BITS = 16
+BANDS = HASH_BITS // BAND_BITS
+# Mongo tier documents compared per lookup
+PERSISTENT_CANDIDATES = 50
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+def hash_bands(image_hash: int) -> List[str]:
+    """
+    Split a hash into BANDS labelled 16-bit bands.
+    Two hashes within BANDS - 1 bits of each other share at least one band
+    (pigeonhole), so near matches can be found by exact band lookups.
+    """
+    mask = (1 << BAND_BITS) - 1
+    return [f"{band}:{(image_hash >> (band * BAND_BITS)) & mask:04x}" for band in range(BANDS)]
+
+class OCRResultCache:
+    """
+    Maps perceptual hashes of label photos to extracted text.
+
+    Near-identical photos (within max_distance bits) reuse the text of an
+    earlier OCR run. The in-memory tier is a bounded LRU with a band index
+    for sub-linear near-match lookups; the optional Mongo tier
+    (ocr_cache collection, same band scheme) survives restarts and is
+    shared between workers.
+
+    Args:
+        maxsize: Entries kept in memory
+        ttl: Seconds an in-memory entry stays valid
+        max_distance: Hamming distance (of HASH_BITS) still treated as the same photo
+        persistent: Also read and write the Mongo tier
+        options_key: OCR settings fingerprint; text from other settings is ignored
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 5000,
+        ttl: float = 86400.0,
+        max_distance: int = 10,
+        persistent: bool = False,
+        options_key: str = ""
+    ):
+        if not 0 <= max_distance < BANDS:
+            raise ValueError(f"max_distance must be below {BANDS}: band lookups only guarantee matches closer than that")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.persistent = persistent
+        self.options_key = options_key
+
+        self._entries: "OrderedDict[int, Tuple[str, float]]" = OrderedDict()
+        self._bands: Dict[str, Set[int]] = {}
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _remove(self, image_hash: int):
+        self._entries.pop(image_hash, None)
+        for band in hash_bands(image_hash):
+            hashes = self._bands.get(band)
+            if hashes is not None:
+                hashes.discard(image_hash)
+                if not hashes:
+                    del self._bands[band]
+
+    def _remember(self, image_hash: int, text: str):
+        if image_hash in self._entries:
+            self._entries.move_to_end(image_hash)
+        else:
+            for band in hash_bands(image_hash):
+                self._bands.setdefault(band, set()).add(image_hash)
+        self._entries[image_hash] = (text, time.monotonic() + self.ttl)
+
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _get_memory(self, image_hash: int) -> Optional[str]:
+        candidates = set()
+        for band in hash_bands(image_hash):
+            candidates.update(self._bands.get(band, ()))
+
+        now = time.monotonic()
+        best, best_text, best_distance = None, None, self.max_distance + 1
+        for candidate in candidates:
+            distance = hamming(image_hash, candidate)
+            if distance >= best_distance:
+                continue
+            text, expires_at = self._entries[candidate]
+            if expires_at <= now:
+                # Expired; a farther candidate may still be valid
+                self._remove(candidate)
+                continue
+            best, best_text, best_distance = candidate, text, distance
+
+        if best is None:
+            return None
+
+        self._entries.move_to_end(best)
+        return best_text
+
+    async def _get_persistent(self, image_hash: int) -> Optional[str]:
+        # Each differing bit spoils at most one band, so a match within
+        # max_distance shares at least BANDS - max_distance bands. Candidates
+        # sharing the most bands (the likeliest nearest) are checked first,
+        # at most PERSISTENT_CANDIDATES of them.
+        bands = hash_bands(image_hash)
+        pipeline = [
+            {"$match": {"bands": {"$in": bands}, "options_key": self.options_key}},
+            {"$project": {
+                "_id": 0, "hash": 1, "text": 1,
+                "shared": {"$size": {"$filter": {"input": "$bands", "cond": {"$in": ["$$this", bands]}}}}
+            }},
+            {"$match": {"shared": {"$gte": BANDS - self.max_distance}}},
+            {"$sort": {"shared": -1}},
+            {"$limit": PERSISTENT_CANDIDATES}
+        ]
+
+        db = get_database()
+        best, best_distance = None, self.max_distance + 1
+        async for doc in db.ocr_cache.aggregate(pipeline):
+            distance = hamming(image_hash, int(doc["hash"], 16))
+            if distance < best_distance:
+                best, best_distance = doc["text"], distance
+        return best
+
+    async def get(self, image_hash: int) -> Optional[str]:
+        """Text for the nearest cached photo, if one is close enough"""
+        text = self._get_memory(image_hash)
+        if text is not None:
+            self.memory_hits += 1
+            return text
+
+        if self.persistent:
+            try:
+                text = await self._get_persistent(image_hash)
+            except Exception as e:
+                logger.warning(f"OCR cache lookup failed: {e}")
+                text = None
+            if text is not None:
+                self.persistent_hits += 1
+                self._remember(image_hash, text)
+                return text
+
+        self.misses += 1
+        return None
+
+    async def set(self, image_hash: int, text: str):
+        self._remember(image_hash, text)
+
+        if self.persistent:
+            try:
+                db = get_database()
+                await db.ocr_cache.update_one(
+                    {"hash": f"{image_hash:064x}", "options_key": self.options_key},
+                    {"$setOnInsert": {
+                        "bands": hash_bands(image_hash),
+                        "text": text,
+                        "created_at": datetime.utcnow()
+                    }},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.warning(f"OCR cache write failed: {e}")
+
+    def stats(self) -> Dict:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        hits = self.memory_hits + self.persistent_hits
+        return {
+            "name": "ocr_results",
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
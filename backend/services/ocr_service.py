@@ -1,76 +1,199 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional, Dict
+from config.env import settings
+from services.latency import LatencyTracker
+from services.ocr_cache import OCRResultCache
+from services import ocr_worker
+import asyncio
 import logging
-import base64
-import io
-from PIL import Image
+import multiprocessing
+import shutil
+import time
 
 logger = logging.getLogger(__name__)
 
+class OCRBusy(Exception):
+    """Raised when the OCR queue is full"""
+
+class OCRTimeout(Exception):
+    """Raised when an image takes longer than the OCR timeout"""
+
 class OCRService:
-    """Service for OCR processing of ingredient labels"""
-    
-    @staticmethod
-    async def extract_ingredients_from_image(image_data: bytes) -> Optional[str]:
+    """
+    Service for OCR processing of ingredient labels.
+
+    Decoding, preprocessing and tesseract all run in a process pool so a
+    slow image never blocks the event loop. At most `workers` images are
+    processed at once and at most `max_queue` wait; beyond that callers get
+    OCRBusy. Each image is bounded by `timeout` seconds.
+
+    Results are cached by perceptual hash, so re-photos of the same label
+    skip OCR entirely (see OCRResultCache).
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queue: int = 8,
+        timeout: float = 15.0,
+        lang: str = "eng",
+        tesseract_config: str = "--oem 1 --psm 6",
+        target_dpi: int = 300,
+        max_side: int = 2000,
+        cache_size: int = 5000,
+        cache_max_distance: int = 10,
+        cache_persistent: bool = False
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.options = {
+            "lang": lang,
+            "config": tesseract_config,
+            "timeout": timeout,
+            "target_dpi": target_dpi,
+            "max_side": max_side
+        }
+        self.cache = OCRResultCache(
+            maxsize=cache_size,
+            max_distance=cache_max_distance,
+            persistent=cache_persistent,
+            options_key=f"{lang}|{tesseract_config}|{target_dpi}|{max_side}"
+        )
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._available: Optional[bool] = None
+
+        self.in_flight = 0
+        self.succeeded = 0
+        self.empty = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.latency = LatencyTracker(name="ocr")
+
+    @property
+    def available(self) -> bool:
+        """Whether the tesseract binary is installed"""
+        if self._available is None:
+            self._available = shutil.which("tesseract") is not None
+            if not self._available:
+                logger.warning("Tesseract not available - install tesseract-ocr to enable image scans")
+        return self._available
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: workers must not inherit the API process's threads and sockets
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=ocr_worker.init_worker
+            )
+        return self._pool
+
+    def _reset_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def extract_ingredients_from_image(self, image_data: bytes) -> Optional[str]:
         """
         Extract ingredient text from image using OCR.
-        
+
         Args:
             image_data: Raw image bytes
-        
+
         Returns:
             Extracted ingredient text or None
+
+        Raises:
+            OCRBusy: Too many images are already queued
+            OCRTimeout: The image took longer than the timeout
         """
-        try:
-            # Validate image
-            image = Image.open(io.BytesIO(image_data))
-            logger.info(f"Image loaded: {image.size} {image.format}")
-            
-            # TODO: Implement OCR
-            # Options:
-            # 1. Tesseract (local) - requires pytesseract
-            # 2. Google Cloud Vision API
-            # 3. AWS Textract
-            # 4. Azure Computer Vision
-            
-            # Placeholder implementation
-            logger.warning("OCR not yet implemented - returning placeholder")
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error processing image: {e}", exc_info=True)
+        if not self.available:
             return None
-    
-    @staticmethod
-    async def extract_with_tesseract(image_data: bytes) -> Optional[str]:
-        """
-        Use Tesseract OCR (local processing).
-        Requires pytesseract and tesseract-ocr installed.
-        """
+
+        # Re-photos of the same bottle reuse the earlier OCR result
         try:
-            import pytesseract
-            from PIL import Image
-            import io
-            
-            image = Image.open(io.BytesIO(image_data))
-            text = pytesseract.image_to_string(image)
-            
-            # Clean up the text
-            text = text.strip()
-            
-            if text:
-                logger.info(f"Tesseract extracted {len(text)} characters")
+            image_hash = await asyncio.to_thread(ocr_worker.dhash, image_data)
+        except Exception as e:
+            logger.warning(f"Could not hash image: {e}")
+            image_hash = None
+
+        if image_hash is not None:
+            text = await self.cache.get(image_hash)
+            if text is not None:
+                logger.info("OCR cache hit")
                 return text
-            
+
+        text = await self.extract_with_tesseract(image_data)
+        if text and image_hash is not None:
+            await self.cache.set(image_hash, text)
+        return text
+
+    async def extract_with_tesseract(self, image_data: bytes) -> Optional[str]:
+        """Run preprocessing and Tesseract for one image in the process pool"""
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise OCRBusy("Too many images queued for OCR")
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            job = self._get_pool().submit(ocr_worker.run_ocr, image_data, self.options)
+            # A job keeps its pool slot until it finishes, even after we stop
+            # waiting for it, so it only leaves in_flight when it is done
+            self.in_flight += 1
+            job.add_done_callback(lambda _: self._job_done(loop))
+            # Queue time counts too; tesseract's own timeout stops the subprocess
+            text = await asyncio.wait_for(asyncio.wrap_future(job), timeout=self.timeout + 5)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise OCRTimeout(f"OCR took longer than {self.timeout:.0f}s")
+        except RuntimeError as e:
+            # pytesseract reports its own timeout as RuntimeError
+            if "timeout" in str(e).lower():
+                self.timeouts += 1
+                raise OCRTimeout(f"OCR took longer than {self.timeout:.0f}s")
+            self.failed += 1
+            logger.error(f"Tesseract OCR failed: {e}")
             return None
-            
-        except ImportError:
-            logger.warning("Tesseract not available - install pytesseract")
+        except BrokenProcessPool:
+            self.failed += 1
+            logger.error("OCR worker crashed - restarting pool")
+            self._reset_pool()
             return None
         except Exception as e:
+            self.failed += 1
             logger.error(f"Tesseract OCR failed: {e}")
             return None
-    
+
+        elapsed = time.perf_counter() - started
+        self.latency.observe(elapsed)
+
+        if not text:
+            self.empty += 1
+            return None
+
+        self.succeeded += 1
+        logger.info(f"Tesseract extracted {len(text)} characters in {elapsed * 1000:.0f} ms")
+        return text
+
+    def _job_done(self, loop: asyncio.AbstractEventLoop):
+        # Runs in the pool's management thread; counters belong to the loop
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # Event loop already closed (shutdown)
+            pass
+
+    def _release(self):
+        self.in_flight -= 1
+
     @staticmethod
     async def extract_with_cloud_api(image_data: bytes, api_key: str) -> Optional[str]:
         """
@@ -80,4 +203,33 @@ class OCRService:
         # This will be implemented when user provides API key
         pass
 
-ocr_service = OCRService()
\ No newline at end of file
+    def stats(self) -> Dict:
+        return {
+            "available": self.available,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "succeeded": self.succeeded,
+            "empty": self.empty,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            **self.latency.stats(),
+            "cache": self.cache.stats()
+        }
+
+    def close(self):
+        self._reset_pool()
+
+ocr_service = OCRService(
+    workers=settings.OCR_WORKERS,
+    max_queue=settings.OCR_MAX_QUEUE,
+    timeout=settings.OCR_TIMEOUT_SECONDS,
+    lang=settings.OCR_LANG,
+    tesseract_config=settings.OCR_TESSERACT_CONFIG,
+    target_dpi=settings.OCR_TARGET_DPI,
+    max_side=settings.OCR_MAX_SIDE,
+    cache_size=settings.OCR_CACHE_SIZE,
+    cache_max_distance=settings.OCR_CACHE_MAX_DISTANCE,
+    cache_persistent=settings.OCR_CACHE_PERSIST
+)
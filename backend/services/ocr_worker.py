@@ -0,0 +1,118 @@
+"""
+OCR work that runs inside the OCR process pool.
+
+Kept free of application imports so worker processes start quickly and
+never touch the event loop, Mongo client or settings of the API process.
+"""
+import io
+import os
+from typing import Dict, Optional
+
+from PIL import Image, ImageChops, ImageFilter, ImageOps
+
+def init_worker():
+    # One tesseract thread per process; the pool provides the parallelism
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+def reduced_decode(image: Image.Image, max_side: int):
+    """
+    Have JPEGs decode straight to grayscale at 1/2, 1/4 or 1/8 scale.
+
+    draft() picks the smallest DCT scale that still covers the requested
+    size, so a 12 MP phone photo is decoded as a ~3 MP grayscale image
+    (about 3 MB instead of 36 MB of RGB). Other formats are unaffected.
+    Must be called before the pixels are loaded.
+    """
+    if image.format not in ("JPEG", "MPO"):
+        return
+
+    original_width = image.width
+    scale = min(1.0, max_side / float(max(image.size)))
+    image.draft("L", (int(image.width * scale), int(image.height * scale)))
+
+    # Keep the reported DPI consistent with the reduced pixel size
+    dpi = image.info.get("dpi")
+    if dpi and image.width != original_width:
+        factor = image.width / float(original_width)
+        image.info["dpi"] = (dpi[0] * factor, dpi[1] * factor)
+
+def preprocess(image: Image.Image, target_dpi: int = 300, max_side: int = 2000, threshold_offset: int = 10) -> Image.Image:
+    """
+    Prepare a label photo for tesseract.
+
+    1. Apply the EXIF orientation so phone photos are upright
+    2. Convert to grayscale
+    3. Downscale to target_dpi (when the image reports its DPI) and to at
+       most max_side pixels on the long edge; never upscale
+    4. Adaptive binarization: a pixel becomes black when it is darker than
+       its local mean by more than threshold_offset, which copes with
+       shadows and glare across curved bottles better than a global cutoff
+    """
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L")
+
+    scale = 1.0
+    dpi = image.info.get("dpi")
+    if dpi and dpi[0] and dpi[0] > target_dpi:
+        scale = target_dpi / float(dpi[0])
+    long_side = max(image.size)
+    if long_side * scale > max_side:
+        scale = max_side / float(long_side)
+    if scale < 1.0:
+        size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+
+    radius = max(8, max(image.size) // 80)
+    local_mean = image.filter(ImageFilter.BoxBlur(radius))
+    darker_than_mean = ImageChops.subtract(local_mean, image)
+    return darker_than_mean.point(lambda value: 0 if value > threshold_offset else 255)
+
+def dhash(image_data: bytes, hash_size: int = 16) -> int:
+    """
+    Difference hash of an image (hash_size * hash_size bits).
+
+    Compares neighbouring pixels of a tiny grayscale thumbnail, so re-photos
+    of the same label differing in exposure, compression or a small shift
+    land within a few bits of each other. JPEGs are decoded at reduced
+    scale, which makes this far cheaper than a full decode.
+    """
+    image = Image.open(io.BytesIO(image_data))
+    image.draft("L", (hash_size * 8, hash_size * 8))
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+
+    pixels = image.tobytes()
+    width = hash_size + 1
+    bits = 0
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+def run_ocr(image_data: bytes, options: Dict) -> Optional[str]:
+    """
+    Decode, preprocess and OCR one image. Runs in a worker process.
+
+    Args:
+        image_data: Raw image bytes
+        options: lang, config, timeout, target_dpi, max_side
+
+    Returns:
+        Extracted text, or None when nothing was recognised
+    """
+    import pytesseract
+
+    image = Image.open(io.BytesIO(image_data))
+    reduced_decode(image, options["max_side"])
+    image = preprocess(image, options["target_dpi"], options["max_side"])
+
+    text = pytesseract.image_to_string(
+        image,
+        lang=options["lang"],
+        config=options["config"],
+        # Kills the tesseract subprocess if it overruns
+        timeout=options["timeout"]
+    )
+    text = text.strip()
+    return text or None
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+from config.env import settings
+from typing import Callable, Dict, Optional, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash operations are already waiting"""
+
+class PasswordService:
+    """
+    bcrypt hashing off the event loop.
+
+    Each hash or verify takes ~100 ms of CPU at the default cost, so it runs
+    in a dedicated thread pool (bcrypt releases the GIL). At most
+    `workers` operations run at once and at most `max_queue` wait behind
+    them; beyond that callers get PasswordHasherBusy rather than piling up
+    latency for every other request.
+
+    Args:
+        rounds: bcrypt cost factor; hashes with a different cost are
+            upgraded on the next successful login
+        workers: Threads dedicated to hashing
+        max_queue: Operations allowed to wait for a free thread
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 2, max_queue: int = 32):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.run_time_total = 0.0
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    async def _run(self, fn: Callable, *args):
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy("Too many password operations queued")
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started, time.perf_counter()
+
+        self.in_flight += 1
+        try:
+            result, started, finished = await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self.in_flight -= 1
+
+        # Metrics are only touched on the event loop thread
+        wait = started - submitted
+        self.completed += 1
+        self.queue_wait_total += wait
+        self.queue_wait_max = max(self.queue_wait_max, wait)
+        self.run_time_total += finished - started
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured cost"""
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password.
+
+        Returns:
+            (valid, new_hash) - new_hash is set when the stored hash used a
+            different cost and should be replaced
+        """
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed_password)
+        if new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> Dict:
+        completed = self.completed or 1
+        return {
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_queue_wait_ms": round(self.queue_wait_total / completed * 1000, 2),
+            "max_queue_wait_ms": round(self.queue_wait_max * 1000, 2),
+            "avg_hash_ms": round(self.run_time_total / completed * 1000, 2)
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+password_service = PasswordService(
+    rounds=settings.BCRYPT_ROUNDS,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
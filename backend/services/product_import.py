@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import codecs
+import csv
+import itertools
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from pydantic import ValidationError
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+from config.db import get_database
+from engine.engine import engine
+from modules.products.models import ProductCreate
+from services.barcode_service import barcode_service
+from services.product_search import build_search_keys
+from services.scoring_service import score_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 1000
+
+# The engine only looks at porosity and scalp type, so these cover every profile
+SCORE_PROFILES = [
+    {"porosity": porosity, "scalp_type": scalp_type}
+    for porosity in ["low", "medium", "high"]
+    for scalp_type in ["dry", "normal", "oily", "sensitive"]
+]
+
+async def iter_upload_lines(upload, chunk_size: int = READ_CHUNK_SIZE) -> AsyncIterator[str]:
+    """Decode an UploadFile incrementally and yield lines (with newlines)"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line + "\n"
+
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+async def iter_file_lines(path: str) -> AsyncIterator[str]:
+    """Yield lines from a local file (CLI imports)"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for line in f:
+            yield line
+
+async def parse_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Dict]:
+    """Yield one row per non-blank line; malformed lines yield an error marker"""
+    async for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+            yield row if isinstance(row, dict) else {"__error__": "Row is not a JSON object"}
+        except ValueError as e:
+            yield {"__error__": f"Invalid JSON: {e}"}
+
+async def parse_csv(lines: AsyncIterator[str]) -> AsyncIterator[Dict]:
+    """
+    Yield rows keyed by the header line.
+    Quoted fields may span lines, so lines are joined until quotes balance.
+    """
+    header: Optional[List[str]] = None
+    record = ""
+
+    async for line in lines:
+        record += line
+        if record.count('"') % 2:
+            continue
+
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not any(value.strip() for value in values):
+            continue
+
+        if header is None:
+            header = [value.strip().lower() for value in values]
+            continue
+
+        yield dict(itertools.zip_longest(header, values, fillvalue=""))
+
+    if record.strip():
+        yield {"__error__": "Unterminated quoted field"}
+
+def _is_blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+def _precompute_scores(ingredients_text: str) -> Dict:
+    """
+    Engine results for every porosity/scalp combination.
+    Barcode scans use them instead of scoring while `version` still matches
+    the loaded ingredient database.
+    """
+    return {
+        "version": engine.ingredient_version,
+        "results": {
+            score_key(profile): engine.score_product(ingredients_text, profile)
+            for profile in SCORE_PROFILES
+        }
+    }
+
+class ProductImporter:
+    """
+    Streaming bulk product import.
+
+    Rows are validated against ProductCreate, de-duplicated by barcode in
+    memory and against Mongo one batch at a time, and written with
+    unordered bulk writes. Memory use is bounded by the batch size plus the
+    set of barcodes seen so far.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        precompute_scores: bool = False,
+        created_by: Optional[str] = None
+    ):
+        self.batch_size = batch_size
+        self.precompute_scores = precompute_scores
+        self.created_by = created_by
+
+        self.rows = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors: List[Dict] = []
+        self._seen_barcodes = set()
+
+    def _error(self, row: int, message: str, duplicate: bool = False):
+        self.error_count += 1
+        if duplicate:
+            self.duplicates += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    async def run(self, rows: AsyncIterator[Dict]) -> Dict:
+        """
+        Import all rows.
+
+        Returns:
+            Import report with counts, per-row errors and throughput
+        """
+        started = time.perf_counter()
+        batch: List[tuple] = []
+
+        async for raw in rows:
+            self.rows += 1
+            row_number = self.rows
+
+            if "__error__" in raw:
+                self._error(row_number, raw["__error__"])
+                continue
+
+            try:
+                # Blank cells count as missing so errors read "Field required"
+                product = ProductCreate(**{
+                    key: value.strip() if isinstance(value, str) else value
+                    for key, value in raw.items()
+                    if key in ProductCreate.model_fields and not _is_blank(value)
+                })
+            except ValidationError as e:
+                self._error(row_number, "; ".join(
+                    f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+                ))
+                continue
+
+            if product.barcode:
+                if product.barcode in self._seen_barcodes:
+                    self._error(row_number, f"Duplicate barcode in file: {product.barcode}", duplicate=True)
+                    continue
+                self._seen_barcodes.add(product.barcode)
+
+            batch.append((row_number, product))
+            if len(batch) >= self.batch_size:
+                await self._flush(batch)
+                batch = []
+
+        if batch:
+            await self._flush(batch)
+
+        elapsed = time.perf_counter() - started
+        report = {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.rows / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        logger.info(
+            f"Product import finished: {self.inserted}/{self.rows} inserted, "
+            f"{self.error_count} errors, {report['rows_per_second']} rows/s"
+        )
+        return report
+
+    async def _flush(self, batch: List[tuple]):
+        db = get_database()
+
+        # Drop rows whose barcode is already in the catalog
+        barcodes = [product.barcode for _, product in batch if product.barcode]
+        existing = set()
+        if barcodes:
+            cursor = db.products.find({"barcode": {"$in": barcodes}}, {"_id": 0, "barcode": 1})
+            existing = {doc["barcode"] async for doc in cursor}
+
+        pending = []
+        for row_number, product in batch:
+            if product.barcode in existing:
+                self._error(row_number, f"Barcode already exists: {product.barcode}", duplicate=True)
+            else:
+                pending.append((row_number, product))
+
+        if not pending:
+            return
+
+        scores: List[Optional[Dict]] = [None] * len(pending)
+        if self.precompute_scores:
+            # Scoring is CPU-bound; keep the event loop responsive
+            scores = await asyncio.to_thread(
+                lambda: [_precompute_scores(product.ingredients_text) for _, product in pending]
+            )
+
+        now = datetime.utcnow()
+        operations = []
+        for (row_number, product), precomputed in zip(pending, scores):
+            doc = {
+                "product_id": str(uuid.uuid4()),
+                "name": product.name,
+                "brand": product.brand,
+                "category": product.category,
+                "ingredients_text": product.ingredients_text,
+                "image_url": product.image_url,
+                "search_keys": build_search_keys(product.name, product.brand),
+                "created_at": now,
+                "updated_at": now,
+                "scan_count": 0,
+                "created_by": self.created_by
+            }
+            # The unique sparse barcode index still indexes explicit nulls,
+            # so a second barcode-less product would be a "duplicate"
+            if product.barcode:
+                doc["barcode"] = product.barcode
+            if precomputed is not None:
+                doc["precomputed_scores"] = precomputed
+            operations.append(InsertOne(doc))
+
+        try:
+            result = await db.products.bulk_write(operations, ordered=False)
+            self.inserted += result.inserted_count
+        except BulkWriteError as e:
+            # Unique-index races with concurrent writers; everything else was written
+            self.inserted += e.details.get("nInserted", 0)
+            for write_error in e.details.get("writeErrors", []):
+                row_number = pending[write_error["index"]][0]
+                self._error(row_number, write_error.get("errmsg", "Write failed"),
+                            duplicate=write_error.get("code") == 11000)
+
+        barcode_service.invalidate(*[product.barcode for _, product in pending])
+
+async def import_products(
+    rows: AsyncIterator[Dict],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    precompute_scores: bool = False,
+    created_by: Optional[str] = None
+) -> Dict:
+    """Import parsed product rows and return the import report"""
+    importer = ProductImporter(batch_size=batch_size, precompute_scores=precompute_scores, created_by=created_by)
+    return await importer.run(rows)
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    """Pick csv or ndjson from a file name or content type"""
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in (content_type or ""):
+        return "ndjson"
+    return "csv"
+
+if __name__ == "__main__":
+    # python -m services.product_import catalog.csv [--format ndjson] [--precompute-scores]
+    from config.db import connect_to_mongo, close_mongo_connection
+
+    parser = argparse.ArgumentParser(description="Bulk import products from CSV or NDJSON")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--precompute-scores", action="store_true")
+    args = parser.parse_args()
+
+    async def main():
+        await connect_to_mongo()
+        file_format = args.format or detect_format(args.path)
+        parse = parse_ndjson if file_format == "ndjson" else parse_csv
+        report = await import_products(
+            parse(iter_file_lines(args.path)),
+            batch_size=args.batch_size,
+            precompute_scores=args.precompute_scores
+        )
+        print(json.dumps(report, indent=2))
+        await close_mongo_connection()
+
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+import asyncio
+import re
+import unicodedata
+from pymongo import UpdateOne
+from config.db import get_database
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Edge n-gram bounds for the indexed search_keys field
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_LENGTH = 20
+
+# Guard rails for user-supplied queries
+MAX_QUERY_TOKENS = 6
+CANDIDATE_MULTIPLIER = 10
+MAX_CANDIDATES = 500
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase, strip accents and collapse punctuation to single spaces"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into normalized search tokens"""
+    return normalize_text(text).split()
+
+def build_search_keys(name: str, brand: Optional[str] = None) -> List[str]:
+    """
+    Build the edge n-gram keys stored on a product.
+    Every token of name and brand contributes all of its prefixes,
+    so "shea moisture" is found by "sh", "shea", "moist", etc.
+    """
+    keys = set()
+    for token in tokenize(name) + tokenize(brand):
+        if len(token) < MIN_PREFIX_LENGTH:
+            keys.add(token)
+            continue
+        for end in range(MIN_PREFIX_LENGTH, min(len(token), MAX_PREFIX_LENGTH) + 1):
+            keys.add(token[:end])
+    return sorted(keys)
+
+def _token_score(query_token: str, tokens: List[str], exact: float, prefix: float) -> float:
+    best = 0.0
+    for token in tokens:
+        if token == query_token:
+            return exact
+        if token.startswith(query_token):
+            best = prefix
+    return best
+
+def rank_product(product: Dict, query_tokens: List[str]) -> float:
+    """Relevance score: name matches outrank brand matches, whole words outrank prefixes"""
+    name_tokens = tokenize(product.get("name"))
+    brand_tokens = tokenize(product.get("brand"))
+
+    score = 0.0
+    for query_token in query_tokens:
+        score += max(
+            _token_score(query_token, name_tokens, exact=3.0, prefix=2.0),
+            _token_score(query_token, brand_tokens, exact=1.5, prefix=1.0)
+        )
+
+    # Bonus when the name starts with the whole query
+    if normalize_text(product.get("name")).startswith(" ".join(query_tokens)):
+        score += 2.0
+
+    return score
+
+class ProductSearchService:
+    """Indexed product search over normalized name and brand prefixes"""
+
+    @staticmethod
+    async def search(query: str, category: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """
+        Search products by name or brand.
+
+        Uses the multikey index on search_keys, so no regex is built from
+        user input. Candidates come back most-scanned first and are then
+        ranked by relevance.
+
+        Args:
+            query: Free-text search query
+            category: Optional category filter
+            limit: Maximum results to return
+
+        Returns:
+            Product documents ordered by relevance
+        """
+        query_tokens = [token[:MAX_PREFIX_LENGTH] for token in tokenize(query)][:MAX_QUERY_TOKENS]
+        if not query_tokens:
+            return []
+
+        db = get_database()
+
+        mongo_query = {"search_keys": {"$all": query_tokens}}
+        if category:
+            mongo_query["category"] = category
+
+        candidate_limit = min(limit * CANDIDATE_MULTIPLIER, MAX_CANDIDATES)
+        cursor = db.products.find(
+            mongo_query,
+            {"_id": 0, "search_keys": 0}
+        ).sort("scan_count", -1).limit(candidate_limit)
+
+        candidates = await cursor.to_list(length=candidate_limit)
+
+        # Stable sort keeps popularity order among equally relevant products
+        candidates.sort(key=lambda product: rank_product(product, query_tokens), reverse=True)
+
+        return candidates[:limit]
+
+    @staticmethod
+    async def backfill_search_keys(batch_size: int = 1000) -> int:
+        """
+        Populate search_keys on products created before indexed search.
+
+        Returns:
+            Number of products updated
+        """
+        db = get_database()
+        cursor = db.products.find(
+            {"search_keys": {"$exists": False}},
+            {"_id": 1, "name": 1, "brand": 1}
+        ).batch_size(batch_size)
+
+        updated = 0
+        batch = []
+        async for product in cursor:
+            batch.append(UpdateOne(
+                {"_id": product["_id"]},
+                {"$set": {"search_keys": build_search_keys(product["name"], product.get("brand"))}}
+            ))
+            if len(batch) >= batch_size:
+                await db.products.bulk_write(batch, ordered=False)
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            await db.products.bulk_write(batch, ordered=False)
+            updated += len(batch)
+
+        logger.info(f"Backfilled search keys for {updated} products")
+        return updated
+
+product_search_service = ProductSearchService()
+
+if __name__ == "__main__":
+    # Backfill existing products: python -m services.product_search
+    from config.db import connect_to_mongo, close_mongo_connection
+
+    async def main():
+        await connect_to_mongo()
+        count = await product_search_service.backfill_search_keys()
+        print(f"Backfilled search keys for {count} products")
+        await close_mongo_connection()
+
+    asyncio.run(main())
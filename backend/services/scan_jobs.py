@@ -0,0 +1,237 @@
+from fastapi import HTTPException
+from config.db import get_database
+from config.env import settings
+from services.latency import LatencyTracker
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = {"completed", "failed"}
+JOB_PROJECTION = {"_id": 0}
+
+class ScanJobsFull(Exception):
+    """Raised when the job queue (or the caller's share of it) is full"""
+
+class ScanJobQueue:
+    """
+    Background processing for slow scans (image OCR).
+
+    Job state lives in the scan_jobs collection so any API worker can answer
+    polls and event streams; the work itself runs in the process that
+    accepted the upload, on a fixed set of worker tasks fed by a bounded
+    asyncio.Queue. Jobs expire `ttl` seconds after their last update
+    (TTL index on expires_at).
+
+    Args:
+        workers: Jobs processed concurrently by this process
+        max_queue: Jobs allowed to wait; beyond that submit raises ScanJobsFull
+        max_per_user: Unfinished jobs allowed per user
+        ttl: Seconds a job record is kept after its last update
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 20, max_per_user: int = 3, ttl: int = 600):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.ttl = ttl
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # job_id -> event set (and replaced) on every status change of a local job
+        self._events: Dict[str, asyncio.Event] = {}
+        self._pending_by_user: Dict[str, int] = {}
+        # Queue slots taken by submits still writing their job record
+        self._reserved = 0
+
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_wait = LatencyTracker(name="scan_job_queue_wait")
+        self.run_time = LatencyTracker(name="scan_job_run")
+
+    async def start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+            logger.info(f"Scan job queue started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() + self._reserved if self._queue is not None else 0
+
+    def _expiry(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.ttl)
+
+    async def submit(self, user_id: str, job_type: str, run: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Queue a job.
+
+        Args:
+            user_id: Owner; only they can read the job
+            job_type: Stored for clients (e.g. "image")
+            run: Coroutine factory doing the work; returns the result document
+                and may raise HTTPException to fail the job with that status
+
+        Returns:
+            The new job record
+        """
+        if self._queue is None:
+            await self.start()
+
+        # Take both slots before the first await, so concurrent submits
+        # can't all pass the checks
+        if self._queue.qsize() + self._reserved >= self.max_queue:
+            self.rejected += 1
+            raise ScanJobsFull("Scan queue is full")
+        if self._pending_by_user.get(user_id, 0) >= self.max_per_user:
+            self.rejected += 1
+            raise ScanJobsFull(f"At most {self.max_per_user} scans can be in progress at once")
+        queue = self._queue
+        self._reserved += 1
+        self._pending_by_user[user_id] = self._pending_by_user.get(user_id, 0) + 1
+
+        now = datetime.utcnow()
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "job_type": job_type,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "error_status": None,
+            "created_at": now,
+            "updated_at": now,
+            "expires_at": self._expiry()
+        }
+
+        try:
+            db = get_database()
+            await db.scan_jobs.insert_one(dict(job))
+        except BaseException:
+            self._reserved -= 1
+            self._release_user(user_id)
+            raise
+
+        self._reserved -= 1
+        if self._queue is not queue or queue.full():
+            # Stopped (shutdown) while the record was written; never leave a job that won't run
+            self.rejected += 1
+            self._release_user(user_id)
+            await db.scan_jobs.update_one(
+                {"job_id": job["job_id"]},
+                {"$set": {"status": "failed", "error": "Scan queue is full", "error_status": 503}}
+            )
+            raise ScanJobsFull("Scan queue is full")
+
+        self._events[job["job_id"]] = asyncio.Event()
+        queue.put_nowait((job["job_id"], user_id, run, time.perf_counter()))
+        self.submitted += 1
+        return job
+
+    def _release_user(self, user_id: str):
+        remaining = self._pending_by_user.get(user_id, 1) - 1
+        if remaining > 0:
+            self._pending_by_user[user_id] = remaining
+        else:
+            self._pending_by_user.pop(user_id, None)
+
+    async def _update(self, job_id: str, fields: Dict):
+        fields["updated_at"] = datetime.utcnow()
+        fields["expires_at"] = self._expiry()
+        db = get_database()
+        await db.scan_jobs.update_one({"job_id": job_id}, {"$set": fields})
+
+        # Wake everyone watching this job, then give later watchers a fresh event
+        event = self._events.pop(job_id, None)
+        if fields.get("status") not in FINAL_STATUSES:
+            self._events[job_id] = asyncio.Event()
+        if event is not None:
+            event.set()
+
+    async def _worker(self):
+        while True:
+            job_id, user_id, run, submitted = await self._queue.get()
+            try:
+                await self._process(job_id, user_id, run, submitted)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scan job {job_id} bookkeeping failed: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str, user_id: str, run: Callable[[], Awaitable[Dict]], submitted: float):
+        started = time.perf_counter()
+        self.queue_wait.observe(started - submitted)
+        self.in_flight += 1
+        try:
+            await self._update(job_id, {"status": "processing"})
+            try:
+                result = await run()
+            except HTTPException as e:
+                self.failed += 1
+                await self._update(job_id, {"status": "failed", "error": e.detail, "error_status": e.status_code})
+                return
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Scan job {job_id} failed: {e}", exc_info=True)
+                await self._update(job_id, {"status": "failed", "error": "Internal server error", "error_status": 500})
+                return
+
+            self.completed += 1
+            await self._update(job_id, {"status": "completed", "result": result})
+        finally:
+            self.in_flight -= 1
+            self.run_time.observe(time.perf_counter() - started)
+            self._release_user(user_id)
+
+    async def get(self, job_id: str, user_id: str) -> Optional[Dict]:
+        """A user's job, or None if it does not exist or has expired"""
+        db = get_database()
+        job = await db.scan_jobs.find_one({"job_id": job_id, "user_id": user_id}, JOB_PROJECTION)
+        # The TTL monitor only runs once a minute
+        if job is None or job["expires_at"] <= datetime.utcnow():
+            return None
+        return job
+
+    def watch(self, job_id: str) -> Optional[asyncio.Event]:
+        """
+        Event set on the job's next status change, if it runs in this process.
+        Grab it before reading the job so no change is missed.
+        """
+        return self._events.get(job_id)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": self.depth,
+            "max_queue": self.max_queue,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_wait": self.queue_wait.stats(),
+            "run_time": self.run_time.stats()
+        }
+
+scan_job_queue = ScanJobQueue(
+    workers=settings.SCAN_JOB_WORKERS,
+    max_queue=settings.SCAN_JOB_MAX_QUEUE,
+    max_per_user=settings.SCAN_JOB_MAX_PER_USER,
+    ttl=settings.SCAN_JOB_TTL_SECONDS
+)
@@ -0,0 +1,144 @@
+import asyncio
+from config.db import get_database
+from typing import Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+VERDICTS = ["GREAT", "CAUTION", "AVOID", "UNKNOWN"]
+
+def empty_scan_stats() -> Dict:
+    """Initial scan counters stored on a new user document"""
+    return {
+        "total": 0,
+        "by_verdict": {verdict: 0 for verdict in VERDICTS}
+    }
+
+def _with_counters(user_id: str) -> Dict:
+    # Only users that already have counters are incremented: $inc on a
+    # legacy user would create partial counters and stop get_scan_stats
+    # from ever reconciling them
+    return {"user_id": user_id, "scan_stats": {"$exists": True}}
+
+class ScanStatsService:
+    """Maintains denormalized per-user scan counters on the users collection"""
+
+    @staticmethod
+    async def record_scan(user_id: str, verdict: str, delta: int = 1):
+        """
+        Adjust a user's scan counters after a scan is inserted (delta=1)
+        or deleted (delta=-1). Users without counters yet are left alone;
+        their first get_scan_stats() counts everything.
+        """
+        db = get_database()
+        await db.users.update_one(
+            _with_counters(user_id),
+            {"$inc": {
+                "scan_stats.total": delta,
+                f"scan_stats.by_verdict.{verdict}": delta
+            }}
+        )
+
+    @staticmethod
+    async def record_scans(user_id: str, verdicts: List[str]):
+        """Adjust a user's scan counters for several inserted scans in one update"""
+        if not verdicts:
+            return
+
+        increments = {"scan_stats.total": len(verdicts)}
+        for verdict in verdicts:
+            key = f"scan_stats.by_verdict.{verdict}"
+            increments[key] = increments.get(key, 0) + 1
+
+        db = get_database()
+        await db.users.update_one(_with_counters(user_id), {"$inc": increments})
+
+    @staticmethod
+    async def get_scan_stats(user: Dict) -> Dict:
+        """
+        Return the scan counters for an already-loaded user document.
+        Users created before counters existed are reconciled once.
+        """
+        stats = user.get("scan_stats")
+        if stats is None:
+            stats = await ScanStatsService.reconcile_user(user["user_id"])
+        
+        # Verdicts never counted for this user are absent from by_verdict
+        complete = empty_scan_stats()
+        complete["total"] = stats.get("total", 0)
+        complete["by_verdict"].update(stats.get("by_verdict", {}))
+        return complete
+
+    @staticmethod
+    async def reconcile_user(user_id: str) -> Dict:
+        """Recount a single user's scans and overwrite their counters"""
+        counts = await ScanStatsService._count_scans({"user_id": user_id})
+        stats = counts.get(user_id, empty_scan_stats())
+
+        db = get_database()
+        await db.users.update_one(
+            {"user_id": user_id},
+            {"$set": {"scan_stats": stats}}
+        )
+        return stats
+
+    @staticmethod
+    async def reconcile_all() -> int:
+        """
+        Recount scans for every user and repair any counters that drifted.
+
+        Returns:
+            Number of users whose counters were corrected
+        """
+        db = get_database()
+        counts = await ScanStatsService._count_scans({})
+        repaired = 0
+
+        cursor = db.users.find({}, {"_id": 0, "user_id": 1, "scan_stats": 1})
+        async for user in cursor:
+            expected = counts.get(user["user_id"], empty_scan_stats())
+            if user.get("scan_stats") != expected:
+                await db.users.update_one(
+                    {"user_id": user["user_id"]},
+                    {"$set": {"scan_stats": expected}}
+                )
+                repaired += 1
+
+        logger.info(f"Scan counter reconciliation repaired {repaired} users")
+        return repaired
+
+    @staticmethod
+    async def _count_scans(match: Dict) -> Dict[str, Dict]:
+        """Aggregate scan counts per user and verdict"""
+        db = get_database()
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {"user_id": "$user_id", "verdict": "$verdict"},
+                "count": {"$sum": 1}
+            }}
+        ]
+
+        counts = {}
+        async for row in db.scans.aggregate(pipeline):
+            user_id = row["_id"]["user_id"]
+            verdict = row["_id"]["verdict"]
+            stats = counts.setdefault(user_id, empty_scan_stats())
+            stats["total"] += row["count"]
+            stats["by_verdict"][verdict] = stats["by_verdict"].get(verdict, 0) + row["count"]
+
+        return counts
+
+scan_stats_service = ScanStatsService()
+
+if __name__ == "__main__":
+    # Repair counter drift: python -m services.scan_stats_service
+    from config.db import connect_to_mongo, close_mongo_connection
+
+    async def main():
+        await connect_to_mongo()
+        repaired = await scan_stats_service.reconcile_all()
+        print(f"Repaired scan counters for {repaired} users")
+        await close_mongo_connection()
+
+    asyncio.run(main())
@@ -1,13 +1,64 @@
 from engine.engine import engine
 from config.db import get_database
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+MISSING_PROFILE_ERROR = {
+    "error": "No hair profile found",
+    "message": "Please complete your hair profile before scanning products",
+    "requires_profile": True
+}
+
+def score_key(hair_profile: Dict) -> str:
+    """Key of a precomputed engine result; the engine only reads porosity and scalp type"""
+    porosity = hair_profile.get("porosity", "medium")
+    scalp_type = hair_profile.get("scalp_type", "normal")
+    # Profiles built from the request models hold enum members
+    return f"{getattr(porosity, 'value', porosity)}:{getattr(scalp_type, 'value', scalp_type)}"
+
 class ScoringService:
     """Service for scoring products against user hair profiles"""
     
+    @staticmethod
+    async def get_hair_profile(user_id: str) -> Optional[Dict]:
+        """The user's hair profile, or None if they have not created one"""
+        db = get_database()
+        return await db.hair_profiles.find_one({"user_id": user_id})
+    
+    @staticmethod
+    def score_with_profile(ingredient_text: str, hair_profile: Dict, precomputed: Optional[Dict] = None) -> Dict:
+        """
+        Score ingredient list against an already loaded hair profile.
+        
+        Args:
+            ingredient_text: Raw ingredient list as text
+            hair_profile: Hair profile document
+            precomputed: A product's precomputed_scores (see product import);
+                used instead of the engine when it matches the profile and
+                the current ingredient database
+        
+        Returns:
+            Scoring result with verdict and explanations, or an error dict
+        """
+        try:
+            result = ScoringService._precomputed_result(precomputed, hair_profile)
+            if result is None:
+                result = engine.score_product(ingredient_text, hair_profile)
+            
+            # Add hair profile info to result
+            result["hair_profile"] = ScoringService._profile_snapshot(hair_profile)
+            
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error scoring ingredients: {e}", exc_info=True)
+            return {
+                "error": "Scoring failed",
+                "message": str(e)
+            }
+    
     @staticmethod
     async def score_ingredients(ingredient_text: str, user_id: str) -> Dict:
         """
@@ -20,39 +71,88 @@ class ScoringService:
         Returns:
             Scoring result with verdict and explanations
         """
+        # Fetch user's hair profile
+        hair_profile = await ScoringService.get_hair_profile(user_id)
+        
+        if not hair_profile:
+            return dict(MISSING_PROFILE_ERROR)
+        
+        # Run the scoring engine
+        return ScoringService.score_with_profile(ingredient_text, hair_profile)
+    
+    @staticmethod
+    async def score_ingredients_batch(
+        ingredient_texts: List[str],
+        user_id: str,
+        precomputed: Optional[List[Optional[Dict]]] = None
+    ) -> Dict:
+        """
+        Score several ingredient lists with a single hair profile lookup
+        and one engine batch.
+        
+        Args:
+            ingredient_texts: Raw ingredient lists as text
+            user_id: User's ID to fetch hair profile
+            precomputed: Each list's product precomputed_scores, in the same
+                order; only lists without a usable result go to the engine
+        
+        Returns:
+            {"results": [...]} in input order, or an error dict
+        """
         db = get_database()
         
-        # Fetch user's hair profile
         hair_profile = await db.hair_profiles.find_one({"user_id": user_id})
         
         if not hair_profile:
-            return {
-                "error": "No hair profile found",
-                "message": "Please complete your hair profile before scanning products",
-                "requires_profile": True
-            }
+            return dict(MISSING_PROFILE_ERROR)
         
-        # Run the scoring engine
         try:
-            result = engine.score_product(ingredient_text, hair_profile)
+            results = [
+                ScoringService._precomputed_result(scores, hair_profile)
+                for scores in precomputed or [None] * len(ingredient_texts)
+            ]
+            misses = [index for index, result in enumerate(results) if result is None]
+            if misses:
+                scored = engine.score_products([ingredient_texts[index] for index in misses], hair_profile)
+                for index, result in zip(misses, scored):
+                    results[index] = result
             
-            # Add hair profile info to result
-            result["hair_profile"] = {
-                "porosity": hair_profile["porosity"],
-                "curl_pattern": hair_profile["curl_pattern"],
-                "scalp_type": hair_profile["scalp_type"],
-                "density": hair_profile["density"]
-            }
+            snapshot = ScoringService._profile_snapshot(hair_profile)
+            for result in results:
+                result["hair_profile"] = snapshot
             
-            return result
+            return {"results": results}
             
         except Exception as e:
-            logger.error(f"Error scoring ingredients: {e}", exc_info=True)
+            logger.error(f"Error scoring ingredient batch: {e}", exc_info=True)
             return {
                 "error": "Scoring failed",
                 "message": str(e)
             }
     
+    @staticmethod
+    def _precomputed_result(precomputed: Optional[Dict], hair_profile: Dict) -> Optional[Dict]:
+        # Results computed against another ingredient database are stale
+        if not precomputed or precomputed.get("version") != engine.ingredient_version:
+            return None
+        result = precomputed.get("results", {}).get(score_key(hair_profile))
+        if result is None:
+            return None
+        # Shared with the product cache; callers add to the result
+        result = dict(result)
+        result["explanation"] = list(result["explanation"])
+        return result
+    
+    @staticmethod
+    def _profile_snapshot(hair_profile: Dict) -> Dict:
+        """Hair profile fields stored with each scan"""
+        return {
+            "porosity": hair_profile["porosity"],
+            "curl_pattern": hair_profile["curl_pattern"],
+            "scalp_type": hair_profile["scalp_type"],
+            "density": hair_profile["density"]
+        }
+    
     @staticmethod
     async def score_product_by_id(product_id: str, user_id: str) -> Dict:
         """
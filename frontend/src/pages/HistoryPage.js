@@ -13,7 +13,7 @@ function HistoryPage() {
 
   const fetchHistory = async () => {
     try {
-      const response = await scanAPI.getHistory({ limit: 50 });
+      const response = await scanAPI.getHistorySummary({ limit: 50 });
       setScans(response.data);
     } catch (err) {
       console.error('Failed to fetch history:', err);
@@ -55,11 +55,13 @@ export const hairProfileAPI = {
 export const scanAPI = {
   scanByIngredients: (data) => api.post('/scans/ingredients', data),
   scanByBarcode: (data) => api.post('/scans/barcode', data),
+  scanByBarcodeBatch: (barcodes) => api.post('/scans/barcode/batch', { barcodes }),
   scanByImage: (formData) => 
     api.post('/scans/image', formData, {
       headers: { 'Content-Type': 'multipart/form-data' },
     }),
   getHistory: (params) => api.get('/scans/history', { params }),
+  getHistorySummary: (params) => api.get('/scans/history/summary', { params }),
   getScan: (scanId) => api.get(`/scans/${scanId}`),
   deleteScan: (scanId) => api.delete(`/scans/${scanId}`),
 };